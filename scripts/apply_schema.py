@@ -5,139 +5,241 @@ Simple wrapper around schemachange for local testing.
 """
 
 import argparse
+import hashlib
+import logging
 import sys
 import os
-import re
 import subprocess
 import tempfile
-import yaml
-import snowflake.connector as sf
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import shutil
 from pathlib import Path
+from types import MappingProxyType
 
-from utils.connection import load_local_config
+from utils.connection import load_local_config, get_connection
+from utils.extraction import sql_literal
 
 
-def preprocess_schema_files(schema_dir, env, db_prefix, db_base):
-    """Preprocess schema files by replacing template variables using the new workflow system."""
-    print(f"🔧 Preprocessing schema files for deployment using workflow system...")
-    
-    # Create a temporary processed directory
-    temp_dir = tempfile.mkdtemp(prefix=f"schema_processed_{env}_")
+logger = logging.getLogger('apply_schema')
+
+
+# Preprocessed schema output is cached here, keyed by SQL contents and template values
+PREPROCESS_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'dp-platform', 'preproc'
+)
+PREPROCESS_CACHE_MAX_ENTRIES = 20
+# Part of the cache key; bump when utils/preprocess_schema output changes
+PREPROCESS_VERSION = 1
+
+# schemachange's default history table; create_schemachange_config leaves it unset
+CHANGE_HISTORY_TABLE = 'METADATA.SCHEMACHANGE.CHANGE_HISTORY'
+
+# Optional overrides for the schema -> database base mapping: {schema_folder: db_base}
+SCHEMA_MAPPING_FILE = os.path.join('schemas', '_mapping.yml')
+
+
+def _load_schema_to_db(mapping_file=SCHEMA_MAPPING_FILE):
+    """Build the schema folder -> database base mapping, merged with the optional mapping file."""
+    # Map schema names to database types based on connections.toml structure
+    mapping = {
+        'DATA_AMS': 'ALTO',
+        'Monitoring': 'PLATFORM',
+        'ReportingApps': 'PLATFORM'
+    }
+    if os.path.isfile(mapping_file):
+        import yaml
+        with open(mapping_file) as f:
+            mapping.update(yaml.safe_load(f) or {})
+    return MappingProxyType(mapping)
+
+
+_SCHEMA_TO_DB = _load_schema_to_db()
+
+
+@dataclass(frozen=True)
+class DeployContext:
+    """Settings for deploying one schema folder, resolved once per schema."""
+    env: str
+    db_prefix: str
+    db_base: str
+    schema_name: str
+    schema_dir: str
+    target_database: str
+    connection_name: str
     
-    try:
-        # Use the new workflow system for preprocessing
-        from scripts.utils.workflow import FinalVersionGenerator
+    @classmethod
+    def from_args(cls, args, local_config, schema_name, schema_dir, target_env, db_prefix):
+        """Resolve database base and target database from CLI args and connection config."""
+        # Determine database base name (ALTO, PLATFORM, etc.)
+        db_base = args.db_base
+        if not db_base:
+            db_base = _SCHEMA_TO_DB.get(schema_name, 'PLATFORM')
+            logger.info(f"📊 Mapped schema {schema_name} to database type: {db_base}")
         
-        # Create final generator to process the schema
-        generator = FinalVersionGenerator(schema_dir)
+        # Determine target database
+        if args.target_database:
+            # Use exact database name provided
+            target_database = args.target_database
+        else:
+            # Get database from connection config
+            target_database = local_config.get('database', '')
+            
+            # Replace template variables in database name
+            if target_database and '{{' in target_database:
+                target_database = target_database.replace('{{ENV}}', target_env)
+                target_database = target_database.replace('{{DB_PREFIX}}', db_prefix or 'TEST')
+                target_database = target_database.replace('{{DB_BASE}}', db_base)
+            elif not target_database:
+                # Create database name using pattern
+                target_database = f'{db_prefix or "TEST"}_{db_base}_{target_env}'
         
-        # Generate processed version with template variables replaced
-        success = generator.generate_final_version(
-            os.path.basename(schema_dir), 
-            target_env=env,
+        return cls(
+            env=target_env,
             db_prefix=db_prefix,
-            db_base=db_base
+            db_base=db_base,
+            schema_name=schema_name,
+            schema_dir=schema_dir,
+            target_database=target_database,
+            connection_name=args.connection,
+        )
+
+
+def _preprocess_cache_key(schema_dir, schema_name, env, db_prefix, db_base):
+    """Hash the schema's SQL files, folder name and template values into a cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    # Entries are laid out as <key>/<schema_name>, so the folder name is part of the key
+    for value in (PREPROCESS_VERSION, schema_name, env, db_prefix, db_base):
+        digest.update(f"{value}\0".encode())
+    for sql_file in sorted(Path(schema_dir).rglob('*.sql')):
+        digest.update(f"{sql_file.relative_to(schema_dir)}\0".encode())
+        digest.update(sql_file.read_bytes())
+    return digest.hexdigest()
+
+
+def _prune_preprocess_cache(keep_dir):
+    """Remove the oldest cache entries beyond PREPROCESS_CACHE_MAX_ENTRIES.
+    
+    Evicted entries are renamed to a .trash- name first, so a deletion cut short at
+    process exit never leaves a partial entry that looks like a cache hit; leftover
+    trash is swept on the next prune.
+    """
+    entries = []
+    doomed = []
+    for entry in os.scandir(PREPROCESS_CACHE_DIR):
+        if not entry.is_dir():
+            continue
+        if entry.name.startswith('.trash-'):
+            doomed.append(entry.path)
+        elif not entry.name.startswith('.') and entry.path != keep_dir:
+            entries.append(entry)
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[PREPROCESS_CACHE_MAX_ENTRIES - 1:]:
+        trash_path = os.path.join(PREPROCESS_CACHE_DIR, f".trash-{entry.name}")
+        try:
+            os.rename(entry.path, trash_path)
+        except OSError:
+            continue
+        doomed.append(trash_path)
+    from utils.workflow.workflow_utils import WorkflowUtils
+    WorkflowUtils.remove_trees_in_background(doomed)
+
+
+def preprocess_schema_files(schema_dir, env, db_prefix, db_base):
+    """Preprocess schema files by replacing template variables.
+    
+    Results are cached under PREPROCESS_CACHE_DIR; when neither the SQL files nor the
+    template values changed, the cached directory is returned without regenerating.
+    The returned directory keeps the schema folder name, which run_schemachange uses
+    as the target schema.
+    """
+    schema_name = os.path.basename(os.path.normpath(schema_dir))
+    cache_key = _preprocess_cache_key(schema_dir, schema_name, env, db_prefix, db_base)
+    cached_dir = os.path.join(PREPROCESS_CACHE_DIR, cache_key)
+    cached_schema_dir = os.path.join(cached_dir, schema_name)
+    if os.path.isdir(cached_schema_dir):
+        logger.info(f"♻️  Reusing cached preprocessed schema files: {cached_schema_dir}")
+        return cached_schema_dir
+    
+    logger.info(f"🔧 Preprocessing schema files for deployment...")
+    
+    # Generate into a staging directory, then rename it into place once complete
+    os.makedirs(PREPROCESS_CACHE_DIR, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=f".{cache_key}_", dir=PREPROCESS_CACHE_DIR)
+    
+    try:
+        from utils.preprocess_schema import preprocess_schema_files as render_schema_files
+        
+        _, processed_files = render_schema_files(
+            schema_dir,
+            env,
+            db_prefix or 'TEST',
+            db_base,
+            output_dir=os.path.join(temp_dir, schema_name)
         )
+        if not processed_files:
+            raise Exception("Preprocessing produced no SQL files")
         
-        if success:
-            print(f"✅ Preprocessing complete using workflow system")
-            return temp_dir
-        else:
-            raise Exception("Workflow preprocessing failed")
+        try:
+            os.rename(temp_dir, cached_dir)
+        except OSError:
+            if os.path.isdir(cached_schema_dir):
+                # Another run populated this cache entry first
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            else:
+                # Stale entry in an older layout; replace it
+                shutil.rmtree(cached_dir, ignore_errors=True)
+                os.rename(temp_dir, cached_dir)
+        
+        _prune_preprocess_cache(cached_dir)
+        logger.info(f"✅ Preprocessing complete")
+        return cached_schema_dir
         
     except Exception as e:
-        print(f"❌ Preprocessing failed: {e}")
-        # Clean up temp directory
+        logger.error(f"❌ Preprocessing failed: {e}")
+        # Clean up staging directory
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise
 
 
-def create_schemachange_config(target_env, local_config, db_prefix="TEST", schema=None, db_base=None):
+def create_schemachange_config(ctx):
     """Create schemachange configuration for target environment (v4 format)."""
-    # Get database from connection config if available
-    target_database = local_config.get('database', '')
-    
-    # Replace template variables in database name
-    if target_database and '{{' in target_database:
-        target_database = target_database.replace('{{ENV}}', target_env.upper())
-        target_database = target_database.replace('{{DB_PREFIX}}', db_prefix or 'TEST')
-        if db_base:
-            target_database = target_database.replace('{{DB_BASE}}', db_base)
-    
-    # If no database specified, create one using the pattern
-    if not target_database:
-        base_db = db_base or 'PLATFORM'
-        target_database = f'{db_prefix}_{base_db}_{target_env.upper()}'
-    
     # For schemachange v4, we use minimal config and rely on connections.toml
     # Don't specify change-history-table to let schemachange use default
     config = {
         'config-version': 1,
         'create-change-history-table': True,
         'vars': {
-            'ENV': target_env.upper(),
-            'DB_PREFIX': db_prefix or 'TEST',
-            'DB_BASE': db_base or 'PLATFORM',
+            'ENV': ctx.env,
+            'DB_PREFIX': ctx.db_prefix or 'TEST',
+            'DB_BASE': ctx.db_base,
+            'SCHEMA': ctx.schema_name,
         }
     }
     
-    # Add schema if provided
-    if schema:
-        config['vars']['SCHEMA'] = schema
-    
     return config
 
 
-def run_schemachange(schema_dir, config_file, connection_name, target_env, db_prefix="TEST", dry_run=False, verbose=True, db_base=None):
-    """Run schemachange for a schema directory using connections.toml (v4 format)."""
-    # Set environment variables for schemachange to use
-    env = os.environ.copy()
-    env['ENV'] = target_env.upper()
-    env['DB_PREFIX'] = db_prefix or 'TEST'  # Default to TEST if None
-    
-    # Set schema name from directory
-    schema_name = os.path.basename(schema_dir)
-    if schema_name:
-        env['SCHEMA'] = schema_name
-        # Set connection type (SRC or TGT) and schema-specific connection
-        env['SC_CONNECTION_TYPE'] = connection_name  # SRC or TGT
-        # Full connection name will be constructed in config
-    
-    # Set database base name (ALTO, PLATFORM, etc.)
-    if db_base:
-        env['DB_BASE'] = db_base
-    
-    # Load the target database from connection config
-    try:
-        # Try to load schema-specific connection first
-        target_config = load_local_config(
-            connections_file="connections.toml", 
-            connection_name=connection_name,
-            schema=schema_name
-        )
-        
-        # Get database name from connection
-        target_database = target_config.get('database', '')
-        
-        # Replace template variables in database name
-        if target_database and '{{' in target_database:
-            target_database = target_database.replace('{{ENV}}', target_env.upper())
-            target_database = target_database.replace('{{DB_PREFIX}}', db_prefix or 'TEST')
-            if db_base:
-                target_database = target_database.replace('{{DB_BASE}}', db_base)
-        
-        if target_database:
-            env['TARGET_DATABASE'] = target_database
-            env['DB_NAME'] = target_database
-            print(f"📊 Using database from connection: {target_database}")
-    except Exception as e:
-        print(f"⚠️  Could not load target database from connection: {e}")
-        
-    # Set target schema from the schema directory name
-    if schema_name:
-        env['TARGET_SCHEMA'] = schema_name
-        print(f"📊 Using schema from folder name: {schema_name}")
+def run_schemachange(ctx, schema_dir, config_file, dry_run=False, verbose=True):
+    """Run schemachange for a (preprocessed) schema directory using connections.toml (v4 format)."""
+    # Collect the schemachange variables, then merge them over the parent environment once
+    sc_env = {
+        'ENV': ctx.env,
+        'DB_PREFIX': ctx.db_prefix or 'TEST',  # Default to TEST if None
+        'SCHEMA': ctx.schema_name,
+        # Connection type (SRC or TGT); full connection name is constructed in config
+        'SC_CONNECTION_TYPE': ctx.connection_name,
+        # Database base name (ALTO, PLATFORM, etc.)
+        'DB_BASE': ctx.db_base,
+        'TARGET_DATABASE': ctx.target_database,
+        'DB_NAME': ctx.target_database,
+        # Target schema comes from the schema folder name
+        'TARGET_SCHEMA': ctx.schema_name,
+    }
+    logger.info(f"📊 Using database: {ctx.target_database}")
+    logger.info(f"📊 Using schema from folder name: {ctx.schema_name}")
     
     cmd = [
         'schemachange', 'deploy',
@@ -152,87 +254,280 @@ def run_schemachange(schema_dir, config_file, connection_name, target_env, db_pr
     if verbose:
         cmd.append('--verbose')
     
-    print(f"Running: {' '.join(cmd)}")
+    logger.info(f"Running: {' '.join(cmd)}")
     
     try:
-        result = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True)
-        if verbose and result.stdout:
-            print("Schemachange output:")
-            print(result.stdout)
+        from schemachange.cli import main as schemachange_main
+    except ImportError:
+        schemachange_main = None
+    
+    if schemachange_main is not None:
+        # Call the schemachange entrypoint directly, skipping a second interpreter start-up
+        returncode = _run_schemachange_in_process(schemachange_main, cmd, sc_env)
+        if returncode != 0:
+            logger.error(f"❌ Schemachange failed with exit code {returncode}")
+            return False
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Schemachange failed with exit code {e.returncode}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
+    
+    # Stream output as it arrives; keep only the tail for the failure summary
+    env = {**os.environ, **sc_env}
+    tail = deque(maxlen=200)
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1)
+    if verbose:
+        logger.info("Schemachange output:")
+    with proc.stdout:
+        for line in proc.stdout:
+            tail.append(line)
+            if verbose:
+                logger.info(line.rstrip('\n'))
+    returncode = proc.wait()
+    
+    if returncode != 0:
+        logger.error(f"❌ Schemachange failed with exit code {returncode}")
+        if not verbose:
+            logger.error(f"Last {len(tail)} lines of output:")
+            logger.error(''.join(tail).rstrip('\n'))
         return False
+    return True
+
+
+def _run_schemachange_in_process(schemachange_main, cmd, sc_env):
+    """Run the schemachange CLI entrypoint in this process. Returns an exit code.
+    
+    schemachange reads its arguments from sys.argv and its config variables from
+    os.environ, so both are swapped in for the call and restored afterwards.
+    The swap is process-wide: do not call this from more than one thread at a time.
+    """
+    saved_argv = sys.argv
+    saved_env = {key: os.environ.get(key) for key in sc_env}
+    sys.argv = list(cmd)
+    os.environ.update(sc_env)
+    try:
+        schemachange_main()
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        # Keep the traceback: unlike the subprocess path there is no output tail to show it
+        logger.exception(f"❌ Schemachange error: {e}")
+        return 1
+    finally:
+        sys.argv = saved_argv
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
 
 
-def run_comparison(target_env, schema, local_config, schema_dir, db_prefix):
+def run_comparison(ctx, local_config):
     """Run pre-deployment comparison. Returns 0 if no changes, 2 if changes, 1 if error."""
+    schema = ctx.schema_name.upper()
+    target_env = ctx.env
+    target_database = ctx.target_database
     try:
         # Import comparison functions
         sys.path.append(os.path.dirname(__file__))
-        from compare_schema import extract_current_state, load_proposed_changes, normalize_ddl, normalize_grant
-        
-        # Connect to target (same logic as compare_schema.py)
-        if db_prefix and db_prefix.lower() != "none":
-            target_database = f"{db_prefix}_PLATFORM_{target_env.upper()}"
-        else:
-            current_db = local_config.get('database', 'PLATFORM_SIT')
-            import re
-            base_db = re.sub(r'_(SIT|DEV|QA|UAT|PROD)$', '', current_db)
-            target_database = f"{base_db}_{target_env.upper()}"
+        from compare_schema import extract_current_state, load_proposed_changes
         
         # Create target connection config
         target_config = local_config.copy()
         target_config['database'] = target_database
         
-        target_conn = sf.connect(**target_config)
+        # Reuse a cached connection so repeated runs skip re-authentication
+        target_conn = get_connection(target_config)
         
-        # Extract current state (handle case where schema doesn't exist yet)
-        try:
-            current_objects, current_grants = extract_current_state(target_conn, target_database, schema, target_env)
-        except Exception as e:
-            if "does not exist" in str(e):
-                print(f"📋 Schema {schema} doesn't exist in target database - this is a first-time deployment")
-                return 2  # Proceed with deployment
-            else:
-                raise e
-        
-        # Load proposed changes
-        proposed_objects, proposed_grants = load_proposed_changes(schema_dir, target_env, target_database)
-        
-        # Compare objects (simplified)
-        all_objects = set(current_objects.keys()) | set(proposed_objects.keys())
-        
-        modified_objects = 0
-        for obj_key in all_objects:
-            current_ddl = current_objects.get(obj_key, '').strip()
-            proposed_ddl = proposed_objects.get(obj_key, '').strip()
-            current_normalized = normalize_ddl(current_ddl)
-            proposed_normalized = normalize_ddl(proposed_ddl)
-            if current_normalized != proposed_normalized:
-                modified_objects += 1
+        # Query Snowflake and read the local SQL files concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            current_future = executor.submit(extract_current_state, target_conn, target_database, schema, target_env)
+            proposed_future = executor.submit(load_proposed_changes, ctx.schema_dir, target_env, target_database)
+            
+            # Extract current state (handle case where schema doesn't exist yet)
+            try:
+                current_objects, current_grants = current_future.result()
+            except Exception as e:
+                if "does not exist" in str(e):
+                    logger.info(f"📋 Schema {schema} doesn't exist in target database - this is a first-time deployment")
+                    return 2  # Proceed with deployment
+                else:
+                    raise e
+            
+            # Load proposed changes
+            proposed_objects, proposed_grants = proposed_future.result()
+        
+        # Compare objects (simplified): objects on one side only are new/removed
+        # unless their DDL normalizes away; shared objects compare normalized DDL.
+        # Values are (raw_ddl, normalized_ddl) pairs, normalized once at load time.
+        current_keys = current_objects.keys()
+        proposed_keys = proposed_objects.keys()
+        modified_objects = sum(
+            1 for obj_key in current_keys ^ proposed_keys
+            if (current_objects.get(obj_key) or proposed_objects.get(obj_key))[1]
+        )
+        modified_objects += sum(
+            1 for obj_key in current_keys & proposed_keys
+            if current_objects[obj_key][1] != proposed_objects[obj_key][1]
+        )
         
         # Compare grants (simplified)
-        current_normalized_grants = {normalize_grant(g) for g in current_grants}
-        proposed_normalized_grants = {normalize_grant(g) for g in proposed_grants}
-        grant_differences = len(proposed_normalized_grants - current_normalized_grants)
+        # Grants are already keyed by their normalized form
+        grant_differences = len(proposed_grants.keys() - current_grants.keys())
         
         total_meaningful = modified_objects + grant_differences
         
-        target_conn.close()
-        
         if total_meaningful == 0:
             return 0  # No changes
         else:
             return 2  # Changes detected
             
     except Exception as e:
-        print(f"⚠️  Comparison check failed: {e}")
+        logger.warning(f"⚠️  Comparison check failed: {e}")
         return 1  # Error
 
 
+def change_history_recorded(ctx, local_config, sql_files):
+    """Return True when schemachange's change history already covers this schema folder.
+    
+    Every versioned script must have a successful row; a folder without versioned
+    scripts needs at least one. Any query failure, such as the table not existing
+    yet on a fresh target, counts as not recorded.
+    """
+    script_names = sorted({sql_file.name for sql_file in sql_files})
+    versioned = {name for name in script_names if name.startswith('V')}
+    
+    target_config = local_config.copy()
+    target_config['database'] = ctx.target_database
+    cursor = None
+    try:
+        cursor = get_connection(target_config).cursor()
+        cursor.execute(
+            f"SELECT DISTINCT SCRIPT FROM {CHANGE_HISTORY_TABLE} "
+            f"WHERE STATUS = 'Success' AND SCRIPT IN ({', '.join(sql_literal(name) for name in script_names)})"
+        )
+        recorded = {row[0] for row in cursor.fetchall()}
+    except Exception as e:
+        logger.info(f"📋 No change history found for {ctx.schema_name}: {e}")
+        return False
+    finally:
+        if cursor is not None:
+            cursor.close()
+    
+    if versioned:
+        return versioned <= recorded
+    return bool(recorded)
+
+
+def deploy_schema(args, schema_name, schema_dir, target_env, db_prefix):
+    """Compare, preprocess and deploy a single schema folder. Returns an exit code."""
+    mode = "Validation" if args.dry_run else "Deployment"
+    
+    # Find SQL files before loading config or opening a Snowflake connection
+    sql_files = list(Path(schema_dir).rglob('*.sql'))
+    
+    if not sql_files:
+        logger.warning(f"⚠️  No SQL files found in {schema_dir}")
+        return 1
+    
+    try:
+        # Try to load schema-specific connection first
+        try:
+            local_config = load_local_config(
+                args.connections, 
+                args.connection,
+                schema_name
+            )
+            logger.info(f"📊 Using schema-specific connection: {args.connection}_{schema_name}")
+        except KeyError:
+            # Fall back to generic connection
+            try:
+                local_config = load_local_config(args.connections, args.connection)
+                logger.info(f"📊 Using generic connection: {args.connection}")
+            except KeyError as e:
+                logger.error(f"❌ Connection '{args.connection}' not found in {args.connections}")
+                return 1
+    except FileNotFoundError:
+        logger.error(f"❌ Configuration file not found: {args.connections}")
+        return 1
+    
+    ctx = DeployContext.from_args(args, local_config, schema_name, schema_dir, target_env, db_prefix)
+    
+    logger.info(f"🚀 Starting {mode} to {target_env} environment")
+    logger.info(f"📂 Schema: {schema_name}")
+    logger.info(f"🎯 Target Database: {ctx.target_database}")
+    logger.info(f"📁 Schema Folder: {schema_dir}")
+    
+    # Create schemachange config
+    sc_config = create_schemachange_config(ctx)
+    
+    # Process the schema
+    logger.info(f"\n📋 Processing schema: {schema_name}")
+    
+    # Run pre-deployment comparison if available
+    try:
+        logger.info(f"🔍 Running pre-deployment comparison...")
+        comparison_result = run_comparison(ctx, local_config)
+        
+        if comparison_result == 0:
+            logger.info(f"✅ MIGRATION STATUS: COMPLETE - Schema {schema_name} already matches target state")
+            if args.force_deploy:
+                logger.info(f"🎯 Proceeding with schemachange (--force-deploy)")
+            elif change_history_recorded(ctx, local_config, sql_files):
+                logger.info(f"⏭️  Skipping schemachange (no changes to apply, change history is up to date)")
+                return 0
+            else:
+                logger.info(f"🎯 Proceeding with schemachange to establish change tracking (no-op deployment)")
+        elif comparison_result == 2:
+            logger.info(f"📝 Changes detected - proceeding with deployment")
+        else:
+            logger.error(f"❌ Comparison failed for schema {schema_name}")
+            return 1
+    except ImportError:
+        logger.info(f"📋 Schema {schema_name} doesn't exist in target database - this is a first-time deployment")
+    except Exception as e:
+        logger.warning(f"⚠️  Comparison failed: {e}")
+        logger.info(f"📝 Changes detected - proceeding with deployment")
+    
+    logger.info(f"📄 Found {len(sql_files)} SQL file(s)" + (":" if args.verbose else ""))
+    if args.verbose:
+        sql_names = sorted(sql_file.name for sql_file in sql_files)
+        for sql_name in sql_names[:20]:
+            logger.info(f"  - {sql_name}")
+        if len(sql_names) > 20:
+            logger.info(f"  ... and {len(sql_names) - 20} more")
+    
+    # Preprocess schema files to replace template variables
+    try:
+        processed_schema_dir = preprocess_schema_files(schema_dir, target_env, db_prefix, ctx.db_base)
+        logger.info(f"🔧 Using preprocessed schema directory: {processed_schema_dir}")
+    except Exception as e:
+        logger.warning(f"⚠️  Preprocessing failed, using original schema directory: {e}")
+        processed_schema_dir = schema_dir
+    
+    # Use schema-specific config if available, otherwise fall back to main config
+    schema_config_path = os.path.join(schema_dir, "schema-config.yml")
+    if os.path.exists(schema_config_path):
+        config_file_path = schema_config_path
+        logger.info(f"📄 Using schema-specific config: {schema_config_path}")
+    else:
+        config_file_path = "schemachange-config.yml"
+        logger.info(f"📄 Using default config: {config_file_path}")
+    
+    # Run schemachange with preprocessed directory (cached, so it is not removed afterwards)
+    if run_schemachange(ctx, processed_schema_dir, config_file_path, args.dry_run, args.verbose):
+        logger.info(f"\n✅ Successfully {'validated' if args.dry_run else 'deployed'} {schema_name}")
+        logger.info(f"📊 {mode} Summary:")
+        logger.info(f"  - Target: {ctx.target_database}")
+        logger.info(f"  - Schema: {schema_name}")
+        logger.info(f"  - Mode: {'Dry Run' if args.dry_run else 'Live Deployment'}")
+        return 0
+    else:
+        logger.error(f"\n❌ Failed to {'validate' if args.dry_run else 'deploy'} {schema_name}")
+        return 1
+
+
 def main():
     """Apply schemas to target environment using schemachange."""
     ap = argparse.ArgumentParser(description="Apply Snowflake schemas using schemachange")
@@ -242,187 +537,79 @@ def main():
     ap.add_argument("--db-prefix", help="Database name prefix (e.g., TEST, PROD)")
     ap.add_argument("--db-base", help="Database base name (e.g., ALTO, PLATFORM)")
     ap.add_argument("--target-database", help="Exact target database name (overrides connection config)")
-    ap.add_argument("--schema-folder", help="Schema folder name to deploy (e.g., DATA_AMS, REPORTINGAPPS)")
+    ap.add_argument("--schema-folder", nargs='+', help="Schema folder name(s) to deploy, space or comma separated (e.g., DATA_AMS ReportingApps)")
     ap.add_argument("--schema-root", default="schemas", help="Root directory containing schema folders")
     ap.add_argument("--dry-run", action="store_true", help="Validate only, don't deploy")
+    ap.add_argument("--force-deploy", action="store_true", help="Run schemachange even when the target already matches")
     ap.add_argument("--verbose", action="store_true", default=True, help="Enable verbose logging")
     args = ap.parse_args()
-
+    
+    # Plain status lines on stdout, warnings and errors on stderr
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.addFilter(lambda record: record.levelno < logging.WARNING)
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setLevel(logging.WARNING)
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[stdout_handler, stderr_handler])
+    
     try:
         # Validate target environment
         valid_envs = ['DEV', 'SIT', 'QA', 'UAT', 'PROD']
         if args.target.upper() not in valid_envs:
-            print(f"❌ Invalid target environment: {args.target}")
-            print(f"Valid environments: {', '.join(valid_envs)}")
+            logger.error(f"❌ Invalid target environment: {args.target}")
+            logger.error(f"Valid environments: {', '.join(valid_envs)}")
             return 1
         
         target_env = args.target.upper()
         db_prefix = args.db_prefix.upper() if args.db_prefix else None
-        mode = "Validation" if args.dry_run else "Deployment"
         
-        # Load local configuration to get schema if not provided
-        try:
-            # First determine schema from folder structure
-            if args.schema_folder:
-                # Use specified schema folder
-                schema_name = args.schema_folder
+        # Determine schema folders from arguments or folder structure
+        if args.schema_folder:
+            # Use specified schema folder(s)
+            schema_names = [name for value in args.schema_folder for name in value.split(',') if name]
+            for schema_name in schema_names:
                 schema_dir = os.path.join(args.schema_root, schema_name)
                 if not os.path.exists(schema_dir):
-                    print(f"❌ Schema folder not found: {schema_dir}")
-                    return 1
-            else:
-                # Auto-detect available schema folders
-                available_schemas = [d for d in os.listdir(args.schema_root) 
-                                  if os.path.isdir(os.path.join(args.schema_root, d)) and not d.startswith('.')]
-                if len(available_schemas) == 1:
-                    schema_name = available_schemas[0]
-                    schema_dir = os.path.join(args.schema_root, schema_name)
-                    print(f"📁 Auto-detected schema folder: {schema_name}")
-                elif len(available_schemas) > 1:
-                    print(f"❌ Multiple schema folders found: {', '.join(available_schemas)}")
-                    print("Please specify --schema-folder to choose one")
-                    return 1
-                else:
-                    print(f"❌ No schema folders found in {args.schema_root}")
+                    logger.error(f"❌ Schema folder not found: {schema_dir}")
                     return 1
-            
-            # Try to load schema-specific connection first
-            try:
-                local_config = load_local_config(
-                    args.connections, 
-                    args.connection,
-                    schema_name
-                )
-                print(f"📊 Using schema-specific connection: {args.connection}_{schema_name}")
-            except KeyError:
-                # Fall back to generic connection
-                try:
-                    local_config = load_local_config(args.connections, args.connection)
-                    print(f"📊 Using generic connection: {args.connection}")
-                except KeyError as e:
-                    print(f"❌ Connection '{args.connection}' not found in {args.connections}")
-                    return 1
-        except FileNotFoundError:
-            print(f"❌ Configuration file not found: {args.connections}")
-            return 1
-        
-        # Schema name and directory are already determined above
-        
-        # Determine database base name (ALTO, PLATFORM, etc.)
-        db_base = args.db_base
-        if not db_base:
-            # Map schema names to database types based on connections.toml structure
-            schema_to_db_mapping = {
-                'DATA_AMS': 'ALTO',
-                'Monitoring': 'PLATFORM',
-                'ReportingApps': 'PLATFORM'
-            }
-            
-            db_base = schema_to_db_mapping.get(schema_name, 'PLATFORM')
-            print(f"📊 Mapped schema {schema_name} to database type: {db_base}")
-        
-        # Determine target database
-        if args.target_database:
-            # Use exact database name provided
-            target_database = args.target_database
         else:
-            # Get database from connection config
-            target_database = local_config.get('database', '')
-            
-            # Replace template variables in database name
-            if target_database and '{{' in target_database:
-                target_database = target_database.replace('{{ENV}}', target_env)
-                target_database = target_database.replace('{{DB_PREFIX}}', db_prefix or 'TEST')
-                target_database = target_database.replace('{{DB_BASE}}', db_base)
-            elif not target_database:
-                # Create database name using pattern
-                target_database = f'{db_prefix or "TEST"}_{db_base}_{target_env}'
-        
-        print(f"🚀 Starting {mode} to {target_env} environment")
-        print(f"📂 Schema: {schema_name}")
-        print(f"🎯 Target Database: {target_database}")
-        print(f"📁 Schema Folder: {schema_dir}")
-        
-        # Create schemachange config
-        sc_config = create_schemachange_config(target_env, local_config, db_prefix)
-        
-        # Process the schema
-        print(f"\n📋 Processing schema: {schema_name}")
-        
-        # Run pre-deployment comparison if available
-        try:
-            print(f"🔍 Running pre-deployment comparison...")
-            comparison_result = run_comparison(target_env, schema_name.upper(), local_config, schema_dir, db_prefix)
-            
-            if comparison_result == 0:
-                print(f"✅ MIGRATION STATUS: COMPLETE - Schema {schema_name} already matches target state")
-                print(f"🎯 Proceeding with schemachange to establish change tracking (no-op deployment)")
-            elif comparison_result == 2:
-                print(f"📝 Changes detected - proceeding with deployment")
-            else:
-                print(f"❌ Comparison failed for schema {schema_name}")
+            # Auto-detect available schema folders
+            available_schemas = [d for d in os.listdir(args.schema_root) 
+                              if os.path.isdir(os.path.join(args.schema_root, d)) and not d.startswith('.')]
+            if len(available_schemas) == 1:
+                schema_names = available_schemas
+                logger.info(f"📁 Auto-detected schema folder: {available_schemas[0]}")
+            elif len(available_schemas) > 1:
+                logger.error(f"❌ Multiple schema folders found: {', '.join(available_schemas)}")
+                logger.error("Please specify --schema-folder to choose one or more")
                 return 1
-        except ImportError:
-            print(f"📋 Schema {schema_name} doesn't exist in target database - this is a first-time deployment")
-        except Exception as e:
-            print(f"⚠️  Comparison failed: {e}")
-            print(f"📝 Changes detected - proceeding with deployment")
-        
-        # Find SQL files
-        sql_files = []
-        for root, dirs, files in os.walk(schema_dir):
-            for file in files:
-                if file.endswith('.sql'):
-                    sql_files.append(os.path.join(root, file))
-        
-        if not sql_files:
-            print(f"⚠️  No SQL files found in {schema_dir}")
-            return 1
-        
-        print(f"📄 Found {len(sql_files)} SQL file(s):")
-        for sql_file in sorted(sql_files):
-            print(f"  - {os.path.basename(sql_file)}")
-        
-        # Preprocess schema files to replace template variables
-        try:
-            processed_schema_dir = preprocess_schema_files(schema_dir, target_env, db_prefix, db_base)
-            print(f"🔧 Using preprocessed schema directory: {processed_schema_dir}")
-        except Exception as e:
-            print(f"⚠️  Preprocessing failed, using original schema directory: {e}")
-            processed_schema_dir = schema_dir
-        
-        # Use schema-specific config if available, otherwise fall back to main config
-        schema_config_path = os.path.join(schema_dir, "schema-config.yml")
-        if os.path.exists(schema_config_path):
-            config_file_path = schema_config_path
-            print(f"📄 Using schema-specific config: {schema_config_path}")
-        else:
-            config_file_path = "schemachange-config.yml"
-            print(f"📄 Using default config: {config_file_path}")
-        
-        # Run schemachange with preprocessed directory
-        try:
-            if run_schemachange(processed_schema_dir, config_file_path, args.connection, target_env, db_prefix, args.dry_run, args.verbose, db_base):
-                print(f"\n✅ Successfully {'validated' if args.dry_run else 'deployed'} {schema_name}")
-                print(f"📊 {mode} Summary:")
-                print(f"  - Target: {target_database}")
-                print(f"  - Schema: {schema_name}")
-                print(f"  - Mode: {'Dry Run' if args.dry_run else 'Live Deployment'}")
-                return 0
             else:
-                print(f"\n❌ Failed to {'validate' if args.dry_run else 'deploy'} {schema_name}")
+                logger.error(f"❌ No schema folders found in {args.schema_root}")
                 return 1
-        finally:
-            # Clean up temporary processed directory if it was created
-            if processed_schema_dir != schema_dir and os.path.exists(processed_schema_dir):
-                try:
-                    shutil.rmtree(processed_schema_dir)
-                    print(f"🧹 Cleaned up temporary directory: {processed_schema_dir}")
-                except Exception as e:
-                    print(f"⚠️  Could not clean up temporary directory: {e}")
+        
+        # Deploy every schema in this process so config parsing and the
+        # cached Snowflake connection are shared across the batch
+        failed_schemas = []
+        for schema_name in schema_names:
+            schema_dir = os.path.join(args.schema_root, schema_name)
+            try:
+                result = deploy_schema(args, schema_name, schema_dir, target_env, db_prefix)
+            except Exception as e:
+                logger.error(f"❌ Error deploying {schema_name}: {e}")
+                result = 1
+            if result != 0:
+                failed_schemas.append(schema_name)
+        
+        if len(schema_names) > 1:
+            logger.info(f"\n📋 BATCH SUMMARY")
+            logger.info(f"Schemas: {len(schema_names)} processed")
+            logger.info(f"✅ Succeeded: {len(schema_names) - len(failed_schemas)}")
+            if failed_schemas:
+                logger.error(f"❌ Failed: {', '.join(failed_schemas)}")
+        
+        return 1 if failed_schemas else 0
         
     except Exception as e:
-        print(f"❌ Error: {e}", file=sys.stderr)
+        logger.error(f"❌ Error: {e}")
         return 1
 
 
@@ -5,22 +5,108 @@ Provides a dry-run report showing what would change.
 """
 
 import argparse
+import contextlib
+import hashlib
+import io
 import sys
 import os
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 import snowflake.connector as sf
-import tomllib
+from snowflake.connector import DictCursor
 from utils.connection import load_connection_config
-from utils.extraction import replace_environment_references
-from utils.schema_config import get_object_types, is_user_defined_object, get_essential_privileges
+from utils.extraction import replace_environment_references, fetch_ddl_batch, sql_literal, GET_DDL_BATCH_SIZE
+from utils.schema_config import get_object_types, filter_user_defined_objects, get_essential_privileges
 
 
-def rows_dict(cursor):
-    """Convert cursor rows to list of dictionaries."""
-    columns = [col[0] for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+# Precompiled patterns for DDL and grant normalization
+_RE_COMMENT = re.compile(r'--.*$', re.MULTILINE)
+_RE_WS = re.compile(r'\s+')
+_RE_WS_PUNCT = re.compile(r'\s*([(),;=])\s*|\s+')
+_RE_ENV_VAR = re.compile(r'\{\{\s*VAR\s*\(\s*["\']ENV["\']\s*\)\s*\}\}')
+_RE_IDENT_SQ = re.compile(r"IDENTIFIER\('([^']+)'\)")
+_RE_IDENT_DQ = re.compile(r'IDENTIFIER\("([^"]+)"\)')
+_RE_SQ = re.compile(r"'([^']+)'")
+_RE_DQ = re.compile(r'"([^"]+)"')
+
+# Precompiled patterns for proposed DDL parsing and database naming
+_RE_TEMPLATE = re.compile(r'\{\{ ENV \}\}|\{\{ DB_PREFIX \}\}|PLATFORM_\{ ENV \}')
+_RE_LINE_COMMENT = re.compile(r'^[ \t]*--[^\n]*\n?', re.MULTILINE)
+_RE_LINE_BREAKS = re.compile(r'\s*\n\s*')
+_RE_CREATE = re.compile(r'create\s+(?:or\s+replace\s+)?(?:secure\s+)?(table|view)\s+([A-Z_][A-Z0-9_]*)[\s(]', re.IGNORECASE)
+# Tokens that may contain a semicolon without ending the statement, plus the terminator itself
+_RE_SQL_TOKEN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|\$\$.*?\$\$|--[^\n]*|/\*.*?\*/|;""", re.DOTALL)
+_RE_ENV_SUFFIX = re.compile(r'_(SIT|DEV|QA|UAT|PROD)$')
+
+# Last comparison report per fingerprint of (target metadata, proposed files)
+COMPARE_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'dp-platform', 'compare_fingerprint.json'
+)
+COMPARE_CACHE_MAX_ENTRIES = 100
+
+# INFORMATION_SCHEMA views (and their schema column) whose LAST_ALTERED and row count
+# feed the report cache fingerprint. TABLES also lists views, materialized views and
+# dynamic tables; streams and tasks have no INFORMATION_SCHEMA view.
+_FINGERPRINT_VIEWS = (
+    ('TABLES', 'TABLE_SCHEMA'),
+    ('SEQUENCES', 'SEQUENCE_SCHEMA'),
+    ('STAGES', 'STAGE_SCHEMA'),
+    ('FILE_FORMATS', 'FILE_FORMAT_SCHEMA'),
+    ('PIPES', 'PIPE_SCHEMA'),
+)
+
+# Concurrent GET_DDL batch queries per schema (stay within warehouse concurrency)
+GET_DDL_WORKERS = 8
+
+
+# Object types from centralized config, resolved once per process
+_OBJECT_TYPES = tuple(get_object_types())
+
+
+# Environment markers in role names (prefix) and in grant text (infix)
+_ENV_ROLE_PREFIXES = ('PROD_', 'DEV_', 'QA_', 'UAT_')
+_ENV_NAME_MARKERS = ('_PROD_', '_DEV_', '_QA_', '_UAT_')
+
+# Object types outside our scope; removed grants on these are reported as scope cleanup
+_UNMANAGED_GRANT_TYPES = (
+    'AGGREGATION POLICY', 'ALERT', 'AUTHENTICATION POLICY', 'CORTEX SEARCH',
+    'DATA METRIC FUNCTION', 'DATASET', 'EVENT TABLE', 'EXTERNAL TABLE',
+    'GIT REPOSITORY', 'ICEBERG TABLE', 'IMAGE REPOSITORY', 'MASKING POLICY',
+    'MODEL', 'NETWORK RULE', 'NOTEBOOK', 'PACKAGES POLICY', 'PASSWORD POLICY',
+    'PRIVACY POLICY', 'PROJECTION POLICY', 'RESOURCE GROUP', 'ROW ACCESS POLICY',
+    'SECRET', 'SERVICE CLASS', 'SERVICE', 'SESSION POLICY', 'SNAPSHOT',
+    'STREAMLIT', 'TAG', 'TEMPORARY TABLE'
+)
+
+
+def _managed_object_types(object_types):
+    """Object type names plus their plural forms (same logic as extraction)."""
+    managed = set()
+    for obj_type, _ in object_types:
+        managed.add(obj_type)
+        if obj_type.endswith('Y'):
+            managed.add(obj_type[:-1] + 'IES')
+        else:
+            managed.add(obj_type + 'S')
+    return frozenset(managed)
+
+
+# Grants for these CREATE privileges are managed; everything else is out of scope
+_MANAGED_OBJECT_TYPES = _managed_object_types(_OBJECT_TYPES)
+_ESSENTIAL_PRIVILEGES = frozenset(get_essential_privileges())
+
+
+def _fetch_ddl_batch_on_new_cursor(connection, obj_type, database, schema, names):
+    """Run fetch_ddl_batch on a cursor owned by the calling thread."""
+    cursor = connection.cursor()
+    try:
+        return fetch_ddl_batch(cursor, obj_type, database, schema, names)
+    finally:
+        cursor.close()
 
 
 def connect_to_target(target_env, local_config, db_prefix=None):
@@ -30,7 +116,7 @@ def connect_to_target(target_env, local_config, db_prefix=None):
     else:
         # Extract base from current connection and add target env
         current_db = local_config.get('database', 'PLATFORM_SIT')
-        base_db = re.sub(r'_(SIT|DEV|QA|UAT|PROD)$', '', current_db)
+        base_db = _RE_ENV_SUFFIX.sub('', current_db)
         target_database = f"{base_db}_{target_env.upper()}"
     
     # Create target connection config
@@ -42,16 +128,21 @@ def connect_to_target(target_env, local_config, db_prefix=None):
 
 
 def extract_current_state(connection, database, schema, target_env=None):
-    """Extract current DDL and grants from target schema."""
+    """Extract current DDL and grants from target schema.
+    
+    Objects are returned as {(object_type, name): (ddl, normalized_ddl)} and
+    grants as {normalized_grant: grant_statement}.
+    """
     current_objects = {}
-    current_grants = []
+    current_grants = {}
     
-    cursor = connection.cursor()
+    # Rows come back as dicts keyed by column name
+    cursor = connection.cursor(DictCursor)
     
     try:
         # Check if schema exists
         cursor.execute(f"SHOW SCHEMAS IN DATABASE {database}")
-        schemas = [r[1] for r in cursor.fetchall()]
+        schemas = [r["name"] for r in cursor]
         
         if schema not in schemas:
             print(f"⚠️  Schema {database}.{schema} does not exist in target")
@@ -59,39 +150,49 @@ def extract_current_state(connection, database, schema, target_env=None):
         
         print(f"📋 Extracting current state of {database}.{schema}")
         
-        # Extract object types from centralized config
-        object_types = get_object_types()
-        
-        for obj_type, show_sql in object_types:
+        # List objects per type, then fetch their DDL in batches
+        ddl_batches = []
+        for obj_type, show_sql in _OBJECT_TYPES:
             try:
                 cursor.execute(show_sql.format(db=database, schema=schema))
-                for row in rows_dict(cursor):
-                    name = row.get("name")
-                    # Only include user-defined objects (exclude system objects)
-                    if name and is_user_defined_object(name):
-                        try:
-                            cursor.execute(f"SELECT GET_DDL('{obj_type}', '{database}.{schema}.{name}')")
-                            ddl = cursor.fetchone()[0]
-                            current_objects[f"{obj_type}:{name}"] = ddl.strip()
-                        except Exception as e:
-                            current_objects[f"{obj_type}:{name}"] = f"-- ERROR: {e}"
+                # Only include user-defined objects (exclude system objects)
+                names = filter_user_defined_objects([row.get("name") for row in cursor])
+                for start in range(0, len(names), GET_DDL_BATCH_SIZE):
+                    ddl_batches.append((obj_type, names[start:start + GET_DDL_BATCH_SIZE]))
             except Exception:
                 pass  # Object type might not exist
         
+        # GET_DDL batches are independent reads, so run them concurrently (one cursor per worker)
+        if ddl_batches:
+            with ThreadPoolExecutor(max_workers=min(GET_DDL_WORKERS, len(ddl_batches))) as executor:
+                futures = [
+                    executor.submit(_fetch_ddl_batch_on_new_cursor, connection, obj_type, database, schema, names)
+                    for obj_type, names in ddl_batches
+                ]
+                for (obj_type, _), future in zip(ddl_batches, futures):
+                    try:
+                        for name, ddl in future.result().items():
+                            current_objects[(obj_type, name)] = (ddl, normalize_ddl(ddl))
+                    except Exception:
+                        pass  # Object type might not exist
+        
         # Extract current grants (only for object types we manage)
         try:
-            # Get managed object types (same logic as extraction)
-            managed_object_types = set()
-            for obj_type, _ in get_object_types():
-                managed_object_types.add(obj_type)
-                if obj_type.endswith('Y'):
-                    managed_object_types.add(obj_type[:-1] + 'IES')
-                else:
-                    managed_object_types.add(obj_type + 'S')
-            essential_privileges = get_essential_privileges()
+            # Role prefixes of the other environments, checked in one startswith call per grant
+            current_env_pattern = f'{target_env.upper()}_'
+            wrong_env_prefixes = tuple(env for env in _ENV_ROLE_PREFIXES if env != current_env_pattern)
             
             cursor.execute(f"SHOW GRANTS ON SCHEMA {database}.{schema}")
-            for row in rows_dict(cursor):
+            
+            # Filter schema-level, right-environment grants server-side so only those rows come back
+            wrong_env_clause = "".join(
+                f" AND \"grantee_name\" NOT LIKE '{prefix[:-1]}!_%' ESCAPE '!'" for prefix in wrong_env_prefixes
+            )
+            cursor.execute(
+                f"SELECT * FROM TABLE(RESULT_SCAN('{cursor.sfqid}'))"
+                f" WHERE \"granted_on\" = 'SCHEMA'{wrong_env_clause}"
+            )
+            for row in cursor:
                 privilege = row.get("privilege")
                 granted_on = row.get("granted_on") 
                 granted_to = row.get("granted_to")
@@ -100,18 +201,16 @@ def extract_current_state(connection, database, schema, target_env=None):
                 name = row.get("name", "")
                 
                 # Only include schema-level grants (granted_on = 'SCHEMA')
-                if all([privilege, granted_on, granted_to, grantee]) and granted_on == "SCHEMA":
+                if granted_on == "SCHEMA" and privilege and granted_to and grantee:
                     
                     # ADDITIVE FILTERING: Only include grants for object types we manage
                     if privilege.startswith("CREATE "):
                         obj_type = privilege.replace("CREATE ", "")
-                        if obj_type not in managed_object_types and privilege not in essential_privileges:
+                        if obj_type not in _MANAGED_OBJECT_TYPES and privilege not in _ESSENTIAL_PRIVILEGES:
                             continue  # Skip grants for object types we don't manage
                     
                     # Skip wrong environment roles - don't manage them
-                    wrong_env_patterns = ['PROD_', 'DEV_', 'QA_', 'UAT_']
-                    current_env_pattern = f'{target_env.upper()}_'
-                    if any(grantee.startswith(env) for env in wrong_env_patterns if env != current_env_pattern):
+                    if grantee.startswith(wrong_env_prefixes):
                         continue  # Skip grants for wrong environment roles
                     
                     grant_str = f"GRANT {privilege} ON {granted_on}"
@@ -120,7 +219,8 @@ def extract_current_state(connection, database, schema, target_env=None):
                     grant_str += f" TO {granted_to} {grantee}"
                     if str(grant_option).upper() == "TRUE":
                         grant_str += " WITH GRANT OPTION"
-                    current_grants.append(grant_str.upper())
+                    grant_str = grant_str.upper()
+                    current_grants[normalize_grant(grant_str)] = grant_str
         except Exception as e:
             print(f"⚠️  Could not extract grants: {e}")
             
@@ -130,64 +230,96 @@ def extract_current_state(connection, database, schema, target_env=None):
     return current_objects, current_grants
 
 
+def iter_sql_statements(text):
+    """Yield the statements in a SQL script, without their terminating semicolons.
+    
+    Semicolons inside quoted strings/identifiers, $$-quoted bodies and comments
+    do not split statements. Blank statements are skipped.
+    """
+    start = 0
+    for match in _RE_SQL_TOKEN.finditer(text):
+        if match.group() == ';':
+            statement = text[start:match.start()]
+            if statement.strip():
+                yield statement
+            start = match.end()
+    statement = text[start:]
+    if statement.strip():
+        yield statement
+
+
+def _substitute_templates(content, substitutions):
+    """Replace template tokens in one pass; tokens without a value are left as-is."""
+    return _RE_TEMPLATE.sub(lambda m: substitutions.get(m.group(0), m.group(0)), content)
+
+
+def _find_prefixed(directory, prefixes):
+    """Return {prefix: path} for the first .sql file in directory starting with each prefix."""
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".sql"):
+                continue
+            for prefix in prefixes:
+                if prefix not in found and entry.name.startswith(prefix):
+                    found[prefix] = entry.path
+            if len(found) == len(prefixes):
+                break
+    return found
+
+
 def load_proposed_changes(schema_dir, target_env, target_database):
-    """Load proposed DDL and grants from schemachange files."""
+    """Load proposed DDL and grants from schemachange files.
+    
+    Objects are returned as {(object_type, name): (ddl, normalized_ddl)} and
+    grants as {normalized_grant: grant_statement}.
+    """
     proposed_objects = {}
-    proposed_grants = []
+    proposed_grants = {}
+    
+    # Template values substituted into the proposed files
+    substitutions = {
+        '{{ ENV }}': target_env.upper(),
+        '{{ DB_PREFIX }}': 'TEST',  # Use default for comparison
+    }
+    grant_substitutions = {**substitutions, 'PLATFORM_{ ENV }': target_database}
+    
+    # Locate the DDL and grants files in a single directory scan
+    versioned_files = _find_prefixed(schema_dir, ("V1000__", "V1001__"))
     
     # Load DDL file
-    ddl_files = [f for f in os.listdir(schema_dir) if f.startswith("V1000__") and f.endswith(".sql")]
-    if ddl_files:
-        ddl_file = os.path.join(schema_dir, ddl_files[0])
+    ddl_file = versioned_files.get("V1000__")
+    if ddl_file:
         print(f"📄 Reading proposed DDL: {ddl_file}")
         
-        with open(ddl_file, 'r') as f:
+        with open(ddl_file, 'r', encoding='utf-8') as f:
             content = f.read()
             
         # Replace variables with actual values
-        content = content.replace('{{ ENV }}', target_env.upper())
-        content = content.replace('{{ DB_PREFIX }}', 'TEST')  # Use default for comparison
-        
-        # Parse DDL into objects (improved parsing)
-        # Split by semicolons first, then identify CREATE statements
-        statements = content.split(';')
+        content = _substitute_templates(content, substitutions)
         
-        for stmt in statements:
-            stmt = stmt.strip()
-            if stmt:
-                # Remove leading comments from the statement
-                stmt_lines = stmt.split('\n')
-                clean_lines = []
-                for line in stmt_lines:
-                    line = line.strip()
-                    if line and not line.startswith('--'):
-                        clean_lines.append(line)
-                clean_stmt = '\n'.join(clean_lines)
-                
-                if clean_stmt:
-                    # Look for CREATE statements (table or view)
-                    match = re.match(r'create\s+(?:or\s+replace\s+)?(secure\s+)?(table|view)\s+([A-Z_][A-Z0-9_]*)[\s\(]', clean_stmt, re.IGNORECASE | re.DOTALL)
-                    if match:
-                        obj_type = match.group(2).upper()  # TABLE or VIEW
-                        obj_name = match.group(3).upper()
-                        # Only include objects we care about
-                        if obj_type in ['TABLE', 'VIEW']:
-                            # Use the clean statement without comments
-                            proposed_objects[f"{obj_type}:{obj_name}"] = clean_stmt
+        # Parse DDL into objects, one statement at a time
+        for stmt in iter_sql_statements(content):
+            # Drop comment lines, trim each line and remove blank ones
+            clean_stmt = _RE_LINE_BREAKS.sub('\n', _RE_LINE_COMMENT.sub('', stmt)).strip()
+            
+            # Look for CREATE statements (table or view)
+            match = _RE_CREATE.match(clean_stmt)
+            if match:
+                obj_type = match.group(1).upper()  # TABLE or VIEW
+                obj_name = match.group(2).upper()
+                proposed_objects[(obj_type, obj_name)] = (clean_stmt, normalize_ddl(clean_stmt))
     
     # Load grants file
-    grant_files = [f for f in os.listdir(schema_dir) if f.startswith("V1001__") and f.endswith(".sql")]
-    if grant_files:
-        grant_file = os.path.join(schema_dir, grant_files[0])
+    grant_file = versioned_files.get("V1001__")
+    if grant_file:
         print(f"🔐 Reading proposed grants: {grant_file}")
         
-        with open(grant_file, 'r') as f:
+        with open(grant_file, 'r', encoding='utf-8') as f:
             content = f.read()
             
         # Replace variables with actual values
-        content = content.replace('{{ ENV }}', target_env.upper())
-        content = content.replace('{{ DB_PREFIX }}', 'TEST')  # Use default for comparison
-        content = content.replace(f'PLATFORM_{{ ENV }}', target_database)
+        content = _substitute_templates(content, grant_substitutions)
         
         # Extract grant statements (normalize format)
         lines = content.split('\n')
@@ -196,11 +328,12 @@ def load_proposed_changes(schema_dir, target_env, target_database):
             if line and line.lower().startswith('grant') and not line.startswith('--'):
                 # Normalize grant statement
                 clean_grant = line.rstrip(';').upper()
-                proposed_grants.append(clean_grant)
+                proposed_grants[normalize_grant(clean_grant)] = clean_grant
     
     return proposed_objects, proposed_grants
 
 
+@lru_cache(maxsize=4096)
 def normalize_ddl(ddl_text):
     """Normalize DDL for comparison by removing whitespace and formatting differences."""
     if not ddl_text:
@@ -210,23 +343,18 @@ def normalize_ddl(ddl_text):
     normalized = ddl_text.upper().strip()
     
     # Remove comments
-    normalized = re.sub(r'--.*$', '', normalized, flags=re.MULTILINE)
-    
-    # Normalize all whitespace (including newlines) to single spaces
-    normalized = re.sub(r'\s+', ' ', normalized)
+    normalized = _RE_COMMENT.sub('', normalized)
     
-    # Remove spaces around specific SQL punctuation
-    normalized = re.sub(r'\s*([(),;])\s*', r'\1', normalized)
+    # One pass: drop whitespace around SQL punctuation, collapse all other whitespace to a space
+    normalized = _RE_WS_PUNCT.sub(lambda m: m.group(1) or ' ', normalized)
     
-    # Normalize common SQL formatting
-    normalized = re.sub(r'\s*,\s*', ',', normalized)
-    normalized = re.sub(r'\s*(=)\s*', r'\1', normalized)
-    
-    # Remove trailing semicolons and whitespace
-    normalized = re.sub(r';\s*$', '', normalized)
+    # Remove the trailing semicolon
+    if normalized.endswith(';'):
+        normalized = normalized[:-1]
     
     # Normalize template variables (in case any leaked through)
-    normalized = re.sub(r'\{\{\s*VAR\s*\(\s*["\']ENV["\']\s*\)\s*\}\}', 'SIT', normalized)
+    if '{{' in normalized:
+        normalized = _RE_ENV_VAR.sub('SIT', normalized)
     
     return normalized.strip()
 
@@ -237,7 +365,8 @@ def compare_objects(current_objects, proposed_objects):
     print("📊 OBJECT COMPARISON REPORT")
     print("="*80)
     
-    all_objects = set(current_objects.keys()) | set(proposed_objects.keys())
+    # Keys are (object_type, name) tuples
+    all_objects = current_objects.keys() | proposed_objects.keys()
     
     changes = {
         'new': [],
@@ -247,12 +376,9 @@ def compare_objects(current_objects, proposed_objects):
     }
     
     for obj_key in sorted(all_objects):
-        current_ddl = current_objects.get(obj_key, '').strip()
-        proposed_ddl = proposed_objects.get(obj_key, '').strip()
-        
-        # Normalize both DDL strings for comparison
-        current_normalized = normalize_ddl(current_ddl)
-        proposed_normalized = normalize_ddl(proposed_ddl)
+        # DDL was normalized when the objects were loaded
+        current_ddl, current_normalized = current_objects.get(obj_key, ('', ''))
+        proposed_ddl, proposed_normalized = proposed_objects.get(obj_key, ('', ''))
         
         if not current_normalized and proposed_normalized:
             changes['new'].append(obj_key)
@@ -263,45 +389,49 @@ def compare_objects(current_objects, proposed_objects):
             # Show a hint about what type of change this is
             if len(current_ddl) != len(proposed_ddl):
                 size_diff = len(proposed_ddl) - len(current_ddl)
-                print(f"   📝 {obj_key}: structural change ({size_diff:+d} chars)")
+                print(f"   📝 {format_object_key(obj_key)}: structural change ({size_diff:+d} chars)")
         else:
             changes['unchanged'].append(obj_key)
     
     # Print summary
     print(f"🆕 NEW OBJECTS: {len(changes['new'])}")
     for obj in changes['new']:
-        print(f"   + {obj}")
+        print(f"   + {format_object_key(obj)}")
     
     print(f"\n🔄 MODIFIED OBJECTS: {len(changes['modified'])}")
     for obj in changes['modified']:
-        print(f"   ~ {obj}")
+        print(f"   ~ {format_object_key(obj)}")
         
     print(f"\n🗑️  REMOVED OBJECTS: {len(changes['removed'])}")
     for obj in changes['removed']:
-        print(f"   - {obj}")
+        print(f"   - {format_object_key(obj)}")
         
     print(f"\n✅ UNCHANGED OBJECTS: {len(changes['unchanged'])}")
     
     return changes
 
 
+def format_object_key(obj_key):
+    """Render an (object_type, name) key as TYPE:NAME."""
+    return f"{obj_key[0]}:{obj_key[1]}"
+
+
+@lru_cache(maxsize=4096)
 def normalize_grant(grant_statement):
     """Normalize grant statement for semantic comparison."""
-    import re
-    
     # Convert to uppercase and strip whitespace
     normalized = grant_statement.upper().strip()
     
     # Remove IDENTIFIER() wrapper - IDENTIFIER('SCHEMA') becomes SCHEMA  
-    normalized = re.sub(r"IDENTIFIER\('([^']+)'\)", r'\1', normalized)
-    normalized = re.sub(r'IDENTIFIER\("([^"]+)"\)', r'\1', normalized)
+    normalized = _RE_IDENT_SQ.sub(r'\1', normalized)
+    normalized = _RE_IDENT_DQ.sub(r'\1', normalized)
     
     # Normalize whitespace - multiple spaces become single space
-    normalized = re.sub(r'\s+', ' ', normalized)
+    normalized = _RE_WS.sub(' ', normalized)
     
     # Standardize schema references - remove extra quotes if any
-    normalized = re.sub(r"'([^']+)'", r'\1', normalized)
-    normalized = re.sub(r'"([^"]+)"', r'\1', normalized)
+    normalized = _RE_SQ.sub(r'\1', normalized)
+    normalized = _RE_DQ.sub(r'\1', normalized)
     
     return normalized.strip()
 
@@ -312,12 +442,12 @@ def compare_grants(current_grants, proposed_grants):
     print("🔐 GRANTS COMPARISON REPORT") 
     print("="*80)
     
-    # Normalize grants for semantic comparison
-    current_normalized = {normalize_grant(g): g for g in current_grants}
-    proposed_normalized = {normalize_grant(g): g for g in proposed_grants}
+    # Grants arrive keyed by their normalized form
+    current_normalized = current_grants
+    proposed_normalized = proposed_grants
     
-    current_set = set(current_normalized.keys())
-    proposed_set = set(proposed_normalized.keys())
+    current_set = current_normalized.keys()
+    proposed_set = proposed_normalized.keys()
     
     new_grants = proposed_set - current_set
     removed_grants = current_set - proposed_set
@@ -342,6 +472,155 @@ def compare_grants(current_grants, proposed_grants):
     }
 
 
+class _Tee:
+    """Write to several streams at once."""
+    
+    def __init__(self, *streams):
+        self.streams = streams
+    
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+    
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def compute_comparison_fingerprint(connection, database, schema, schema_dir, target_env):
+    """Fingerprint the target schema's metadata and the proposed files.
+    
+    Uses INFORMATION_SCHEMA LAST_ALTERED timestamps and object counts for each
+    of _FINGERPRINT_VIEWS, plus the count and newest CREATED time of the
+    privileges on the schema and its objects, which one cheap query returns.
+    Streams and tasks are not covered. Returns None if the metadata cannot be read.
+    """
+    schema_literal = sql_literal(schema)
+    info_schema = f"{database}.INFORMATION_SCHEMA"
+    columns = []
+    for view, schema_column in _FINGERPRINT_VIEWS:
+        columns.append(f"(SELECT MAX(LAST_ALTERED) FROM {info_schema}.{view} WHERE {schema_column} = {schema_literal})")
+        columns.append(f"(SELECT COUNT(*) FROM {info_schema}.{view} WHERE {schema_column} = {schema_literal})")
+    grants_filter = (
+        f"OBJECT_SCHEMA = {schema_literal}"
+        f" OR (OBJECT_TYPE = 'SCHEMA' AND OBJECT_NAME = {schema_literal})"
+    )
+    columns.append(f"(SELECT MAX(CREATED) FROM {info_schema}.OBJECT_PRIVILEGES WHERE {grants_filter})")
+    columns.append(f"(SELECT COUNT(*) FROM {info_schema}.OBJECT_PRIVILEGES WHERE {grants_filter})")
+    columns.append(f"(SELECT LAST_ALTERED FROM {info_schema}.SCHEMATA WHERE SCHEMA_NAME = {schema_literal})")
+    
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT " + ", ".join(columns))
+        target_state = cursor.fetchone()
+    except Exception as e:
+        print(f"⚠️  Could not read target metadata for the report cache: {e}")
+        return None
+    finally:
+        cursor.close()
+    
+    digest = hashlib.sha1()
+    for value in (database, schema, target_env.upper(), *target_state):
+        digest.update(f"{value}\0".encode())
+    for path in sorted(_find_prefixed(schema_dir, ("V1000__", "V1001__")).values()):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_cached_report(fingerprint):
+    """Return the cached {'report', 'exit_code'} for a fingerprint, or None."""
+    if not fingerprint:
+        return None
+    try:
+        with open(COMPARE_CACHE_FILE, 'r') as f:
+            return json.load(f).get(fingerprint)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_report(fingerprint, report, exit_code):
+    """Store a report under its fingerprint, keeping the most recent entries."""
+    try:
+        with open(COMPARE_CACHE_FILE, 'r') as f:
+            reports = json.load(f)
+    except (OSError, ValueError):
+        reports = {}
+    reports.pop(fingerprint, None)
+    reports[fingerprint] = {'report': report, 'exit_code': exit_code}
+    reports = dict(list(reports.items())[-COMPARE_CACHE_MAX_ENTRIES:])
+    try:
+        os.makedirs(os.path.dirname(COMPARE_CACHE_FILE), exist_ok=True)
+        tmp_file = f"{COMPARE_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(reports, f)
+        os.replace(tmp_file, COMPARE_CACHE_FILE)
+    except OSError:
+        pass  # The cache is an optimization only
+
+
+def compare_and_report(target_conn, target_database, schema_dir, args):
+    """Extract, compare and print the report. Returns 0 if no changes, 2 if changes."""
+    # Extract current state
+    current_objects, current_grants = extract_current_state(target_conn, target_database, args.schema.upper(), args.target_env)
+    
+    # Load proposed changes
+    proposed_objects, proposed_grants = load_proposed_changes(schema_dir, args.target_env, target_database)
+    
+    # Compare objects
+    object_changes = compare_objects(current_objects, proposed_objects)
+    
+    # Compare grants
+    grant_changes = compare_grants(current_grants, proposed_grants)
+    
+    # Enhanced Summary with categorization
+    managed_object_changes = len(object_changes['new']) + len(object_changes['modified']) + len(object_changes['removed'])
+    meaningful_grant_changes = len(grant_changes['new'])
+    
+    # Categorize removed grants
+    scope_cleanup_grants = []
+    environment_cleanup_grants = []
+    
+    wrong_env_markers = tuple(env for env in _ENV_NAME_MARKERS if env != f'_{args.target_env}_')
+    for grant in grant_changes['removed']:
+        if any(env in grant for env in wrong_env_markers):
+            environment_cleanup_grants.append(grant)
+        elif any(policy_type in grant for policy_type in _UNMANAGED_GRANT_TYPES):
+            scope_cleanup_grants.append(grant)
+    
+    meaningful_changes = managed_object_changes + meaningful_grant_changes + len(environment_cleanup_grants)
+    
+    print("\n" + "="*80)
+    print("📋 ENHANCED SUMMARY")
+    print("="*80)
+    
+    if meaningful_changes == 0 and len(scope_cleanup_grants) == 0:
+        print("✅ No changes detected - target schema matches proposed state")
+        print("🎯 MIGRATION STATUS: COMPLETE - Existing database already matches schemachange files")
+        print("📋 This indicates the target database is already in the desired state")
+        print("🚀 Safe to proceed with schemachange deployment (will be a no-op)")
+        return 0
+    
+    print(f"📝 MEANINGFUL CHANGES: {meaningful_changes}")
+    if managed_object_changes > 0:
+        print(f"   • {managed_object_changes} object changes (tables, views, etc.)")
+    if meaningful_grant_changes > 0:
+        print(f"   • {meaningful_grant_changes} new grants")
+    if len(environment_cleanup_grants) > 0:
+        print(f"   • {len(environment_cleanup_grants)} environment cleanup (wrong env roles)")
+        
+    if len(scope_cleanup_grants) > 0:
+        print(f"\n🧹 SCOPE CLEANUP: {len(scope_cleanup_grants)} grants for unmanaged object types")
+        print("   (This is expected - removing grants for object types outside your scope)")
+    
+    total_changes = meaningful_changes + len(scope_cleanup_grants)
+    print(f"\n📊 TOTAL REPORTED: {total_changes} changes")
+    print("🚀 Run deployment to apply these changes")
+    
+    return 2 if meaningful_changes > 0 else 0
+
+
 def main():
     """Compare target schema with proposed changes."""
     parser = argparse.ArgumentParser(description="Compare target schema with proposed schemachange files")
@@ -351,6 +630,9 @@ def main():
     parser.add_argument("--schema", required=True, help="Schema name to compare")
     parser.add_argument("--schema-dir", help="Schema directory (default: schemas/SCHEMA)")
     parser.add_argument("--db-prefix", help="Database prefix for target environment")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Reuse the last report when the target's object metadata, grants and the proposed files are unchanged "
+                             "(stream and task changes are not detected)")
     
     args = parser.parse_args()
     
@@ -370,70 +652,23 @@ def main():
         # Connect to target
         target_conn, target_database = connect_to_target(args.target_env, local_config, args.db_prefix)
         
-        # Extract current state
-        current_objects, current_grants = extract_current_state(target_conn, target_database, args.schema.upper(), args.target_env)
-        
-        # Load proposed changes
-        proposed_objects, proposed_grants = load_proposed_changes(schema_dir, args.target_env, target_database)
-        
-        # Compare objects
-        object_changes = compare_objects(current_objects, proposed_objects)
-        
-        # Compare grants
-        grant_changes = compare_grants(current_grants, proposed_grants)
-        
-        # Enhanced Summary with categorization
-        managed_object_changes = len(object_changes['new']) + len(object_changes['modified']) + len(object_changes['removed'])
-        meaningful_grant_changes = len(grant_changes['new'])
-        
-        # Categorize removed grants
-        scope_cleanup_grants = []
-        environment_cleanup_grants = []
-        
-        for grant in grant_changes['removed']:
-            if any(env in grant for env in ['_PROD_', '_DEV_', '_QA_', '_UAT_'] if env != f'_{args.target_env}_'):
-                environment_cleanup_grants.append(grant)
-            elif any(policy_type in grant for policy_type in [
-                'AGGREGATION POLICY', 'ALERT', 'AUTHENTICATION POLICY', 'CORTEX SEARCH',
-                'DATA METRIC FUNCTION', 'DATASET', 'EVENT TABLE', 'EXTERNAL TABLE',
-                'GIT REPOSITORY', 'ICEBERG TABLE', 'IMAGE REPOSITORY', 'MASKING POLICY',
-                'MODEL', 'NETWORK RULE', 'NOTEBOOK', 'PACKAGES POLICY', 'PASSWORD POLICY',
-                'PRIVACY POLICY', 'PROJECTION POLICY', 'RESOURCE GROUP', 'ROW ACCESS POLICY',
-                'SECRET', 'SERVICE CLASS', 'SERVICE', 'SESSION POLICY', 'SNAPSHOT',
-                'STREAMLIT', 'TAG', 'TEMPORARY TABLE'
-            ]):
-                scope_cleanup_grants.append(grant)
-        
-        meaningful_changes = managed_object_changes + meaningful_grant_changes + len(environment_cleanup_grants)
-        
-        print("\n" + "="*80)
-        print("📋 ENHANCED SUMMARY")
-        print("="*80)
-        
-        if meaningful_changes == 0 and len(scope_cleanup_grants) == 0:
-            print("✅ No changes detected - target schema matches proposed state")
-            print("🎯 MIGRATION STATUS: COMPLETE - Existing database already matches schemachange files")
-            print("📋 This indicates the target database is already in the desired state")
-            print("🚀 Safe to proceed with schemachange deployment (will be a no-op)")
-            return 0
-        
-        print(f"📝 MEANINGFUL CHANGES: {meaningful_changes}")
-        if managed_object_changes > 0:
-            print(f"   • {managed_object_changes} object changes (tables, views, etc.)")
-        if meaningful_grant_changes > 0:
-            print(f"   • {meaningful_grant_changes} new grants")
-        if len(environment_cleanup_grants) > 0:
-            print(f"   • {len(environment_cleanup_grants)} environment cleanup (wrong env roles)")
-            
-        if len(scope_cleanup_grants) > 0:
-            print(f"\n🧹 SCOPE CLEANUP: {len(scope_cleanup_grants)} grants for unmanaged object types")
-            print("   (This is expected - removing grants for object types outside your scope)")
-        
-        total_changes = meaningful_changes + len(scope_cleanup_grants)
-        print(f"\n📊 TOTAL REPORTED: {total_changes} changes")
-        print("🚀 Run deployment to apply these changes")
+        # Reuse the last report when neither the target schema nor the proposed files changed
+        fingerprint = None
+        if args.use_cache:
+            fingerprint = compute_comparison_fingerprint(target_conn, target_database, args.schema.upper(), schema_dir, args.target_env)
+            cached = load_cached_report(fingerprint)
+            if cached:
+                print("♻️  Target schema and proposed files unchanged since the last comparison - showing cached report")
+                print(cached['report'], end='')
+                return cached['exit_code']
         
-        return 2 if meaningful_changes > 0 else 0
+        # Run the comparison, keeping a copy of the report for the fingerprint cache
+        report = io.StringIO()
+        with contextlib.redirect_stdout(_Tee(sys.stdout, report)):
+            exit_code = compare_and_report(target_conn, target_database, schema_dir, args)
+        if fingerprint and exit_code != 1:
+            save_cached_report(fingerprint, report.getvalue(), exit_code)
+        return exit_code
             
     except Exception as e:
         print(f"❌ Error: {e}")
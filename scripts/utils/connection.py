@@ -1,16 +1,54 @@
 #!/usr/bin/env python3
-"""Connection utilities for Snowflake."""
+"""Connection utilities for Snowflake.
 
+connections.toml is read with tomllib (Python 3.11+), falling back to
+tomli or rtoml on older interpreters.
+"""
+
+import atexit
 import os
+from functools import lru_cache
 
-# Handle both Python 3.11+ (tomllib) and older versions (toml)
+# TOML parser: tomllib on Python 3.11+, otherwise tomli (same API) or rtoml.
+# The legacy 'toml' package is no longer supported.
 try:
     import tomllib
 except ImportError:
     try:
-        import toml as tomllib
+        import tomli as tomllib
     except ImportError:
-        raise ImportError("Either 'tomllib' (Python 3.11+) or 'toml' package is required")
+        try:
+            import rtoml as _rtoml
+        except ImportError:
+            raise ImportError("Either 'tomllib' (Python 3.11+), 'tomli' or 'rtoml' package is required")
+        
+        class tomllib:
+            """Minimal tomllib-compatible wrapper around rtoml."""
+            
+            @staticmethod
+            def load(f):
+                return _rtoml.loads(f.read().decode("utf-8"))
+
+
+# Open Snowflake connections keyed by (account, user, role, database)
+_CONN_CACHE = {}
+
+
+@lru_cache(maxsize=8)
+def _parse_toml(path, mtime_ns, size):
+    """Parse a TOML file; mtime_ns and size are part of the cache key so edits are picked up.
+    
+    The parsed dict is shared between callers, treat it as read-only.
+    """
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def _load_toml(connections_file):
+    """Load connections.toml, parsing it at most once per file version."""
+    path = os.path.abspath(connections_file)
+    st = os.stat(path)
+    return _parse_toml(path, st.st_mtime_ns, st.st_size)
 
 
 def load_connection_config(is_ci=False, connections_file="connections.toml", connection_name="SRC"):
@@ -27,10 +65,9 @@ def load_connection_config(is_ci=False, connections_file="connections.toml", con
             'schema': os.environ.get('SNOWFLAKE_SCHEMA', 'PUBLIC')
         }
     else:
-        # Local environment - use connections.toml
-        with open(connections_file, "rb") as f:
-            data = tomllib.load(f)
-        return data[connection_name]
+        # Local environment - use connections.toml (copy: callers mutate it)
+        data = _load_toml(connections_file)
+        return dict(data[connection_name])
 
 
 def load_local_config(connections_file="connections.toml", connection_name="SRC", schema=None):
@@ -41,14 +78,69 @@ def load_local_config(connections_file="connections.toml", connection_name="SRC"
         connection_name: Base connection name (SRC or TGT)
         schema: Schema name to append to connection_name (e.g., DATA_AMS)
     """
-    with open(connections_file, "rb") as f:
-        data = tomllib.load(f)
+    data = _load_toml(connections_file)
     
-    # Try schema-specific connection first, fall back to generic connection
+    # Try schema-specific connection first, fall back to generic connection.
+    # Return copies since the parsed TOML is cached and callers mutate the result.
     if schema:
         schema_specific_name = f"{connection_name}_{schema}"
         if schema_specific_name in data:
-            return data[schema_specific_name]
+            return dict(data[schema_specific_name])
     
     # Fall back to generic connection
-    return data[connection_name]
+    return dict(data[connection_name])
+
+
+def _is_alive(conn):
+    """Check that a cached connection can still run queries."""
+    if conn.is_closed():
+        return False
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def get_connection(connection_config):
+    """Get a Snowflake connection, reusing an open one for the same target.
+    
+    Connections are cached per process so repeated calls (comparison, extraction,
+    audit writes) authenticate only once. Callers must not close the returned
+    connection; all cached connections are closed at interpreter exit.
+    """
+    key = (
+        connection_config.get('account'),
+        connection_config.get('user'),
+        connection_config.get('role'),
+        connection_config.get('database'),
+    )
+    
+    conn = _CONN_CACHE.get(key)
+    if conn is not None and _is_alive(conn):
+        return conn
+    
+    import snowflake.connector as sf
+    
+    config = dict(connection_config)
+    config.setdefault('client_session_keep_alive', True)
+    conn = sf.connect(**config)
+    _CONN_CACHE[key] = conn
+    return conn
+
+
+def close_all_connections():
+    """Close every cached Snowflake connection."""
+    while _CONN_CACHE:
+        _, conn = _CONN_CACHE.popitem()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_all_connections)
@@ -3,15 +3,92 @@
 
 import os
 import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import snowflake.connector as sf
-from .schema_config import get_object_types, is_user_defined_object, get_essential_privileges
+from pathlib import Path
+from .schema_config import get_object_types, get_essential_privileges, user_defined_object_filter
 
+# Environment suffix patterns, one alternation each so content is scanned once
+_ENV_SUFFIX_RE = re.compile(r'_(SIT|QA|UAT|PROD)(?=_|\s|$)')
+_ENV_DB_SUFFIX_RE = re.compile(r'_(SIT|QA|UAT|PROD)(?=_|\.|$)')
 
-def rows_dict(cursor):
-    """Convert cursor rows to list of dictionaries."""
-    columns = [col[0] for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+# Server-side equivalent of is_user_defined_object for SHOW results
+USER_DEFINED_OBJECT_FILTER = user_defined_object_filter()
+
+# Objects per GET_DDL batch query, kept well under Snowflake's statement size limit
+GET_DDL_BATCH_SIZE = 200
+# Schemas extracted concurrently by extract_schemas (stay within warehouse concurrency)
+EXTRACT_SCHEMA_WORKERS = 8
+# Write buffer for baseline DDL/grant files, which can run to several MB
+WRITE_BUFFER_SIZE = 1 << 20
+# fetch_ddl_batch marks objects whose GET_DDL failed with this prefix
+DDL_ERROR_PREFIX = '-- ERROR: '
+
+
+def _fetch_arrow_table(cursor):
+    """Fetch the whole result as an Arrow table, or None if Arrow is unavailable.
+    
+    Needs pyarrow (snowflake-connector-python[pandas]) and an Arrow result set;
+    SHOW output is JSON, so select it through RESULT_SCAN to benefit.
+    """
+    if not hasattr(cursor, 'fetch_arrow_all'):
+        return None
+    try:
+        return cursor.fetch_arrow_all()
+    except Exception:
+        return None
+
+
+def rows_ntuple(cursor):
+    """Convert cursor rows to a list of namedtuples with lowercase column fields."""
+    Row = namedtuple('Row', [col[0].lower() for col in cursor.description], rename=True)
+    
+    # Decode column-wise from Arrow when possible, row by row otherwise
+    table = _fetch_arrow_table(cursor)
+    if table is not None:
+        return list(map(Row._make, zip(*(column.to_pylist() for column in table.columns))))
+    return [Row._make(row) for row in cursor.fetchall()]
+
+
+def sql_literal(value):
+    """Quote a value as a SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def fetch_ddl_batch(cursor, obj_type, database, schema, names):
+    """Fetch DDL for several objects of one type in a single UNION ALL query.
+    
+    Returns {name: ddl}. If the batch query fails (e.g. an object was dropped
+    mid-run), falls back to one GET_DDL per object so errors stay per object.
+    """
+    if not names:
+        return {}
+    
+    sql = "\nUNION ALL\n".join(
+        f"SELECT {sql_literal(name)}, GET_DDL('{obj_type}', {sql_literal(f'{database}.{schema}.{name}')})"
+        for name in names
+    )
+    try:
+        cursor.execute(sql)
+        return {name: (ddl or '').strip() for name, ddl in cursor.fetchall()}
+    except Exception:
+        pass
+    
+    ddls = {}
+    for name in names:
+        try:
+            cursor.execute(f"SELECT GET_DDL('{obj_type}', {sql_literal(f'{database}.{schema}.{name}')})")
+            ddls[name] = cursor.fetchone()[0].strip()
+        except Exception as e:
+            ddls[name] = f"{DDL_ERROR_PREFIX}{e}"
+    return ddls
+
+
+def _rewrite_env_suffixes(pattern, content, target_env):
+    """Rewrite every _<ENV> suffix matched by pattern to _<target_env> in one pass."""
+    target_suffix = f'_{target_env}'
+    return pattern.sub(lambda m: target_suffix if m.group(1) != target_env else m.group(0), content)
 
 
 def replace_environment_references(content, target_env="DEV", db_prefix=None, db_base=None):
@@ -31,10 +108,7 @@ def replace_environment_references(content, target_env="DEV", db_prefix=None, db
         content = content.replace('{{DB_BASE}}', db_base)
     
     # Replace specific environment patterns (SIT -> target)
-    env_patterns = ['SIT', 'QA', 'UAT', 'PROD']
-    for env in env_patterns:
-        if env != target_env.upper():
-            content = re.sub(f'_{env}(?=_|\\s|$)', f'_{target_env.upper()}', content)
+    content = _rewrite_env_suffixes(_ENV_SUFFIX_RE, content, target_env.upper())
     
     return content
 
@@ -47,98 +121,114 @@ def template_environment_references(content, source_env, target_env, db_base=Non
     # Replace database references (e.g., PLATFORM_SIT -> {{DB_BASE}}_{{ENV}}) 
     # BUT ONLY when they refer to the current database being extracted
     if db_base:
-        # Replace references to the current database type + environment
-        current_db_pattern = rf'{re.escape(db_base)}_{re.escape(source_env)}'
-        content = re.sub(current_db_pattern, '{{DB_BASE}}_{{ENV}}', content)
-        
-        # Also replace lowercase versions
-        current_db_pattern_lower = rf'{re.escape(db_base.lower())}_{re.escape(source_env)}'
-        content = re.sub(current_db_pattern_lower, '{{DB_BASE}}_{{ENV}}', content)
+        # Replace references to the current database type + environment,
+        # then the lowercase versions
+        content = content.replace(f'{db_base}_{source_env}', '{{DB_BASE}}_{{ENV}}')
+        content = content.replace(f'{db_base.lower()}_{source_env}', '{{DB_BASE}}_{{ENV}}')
     
     # Replace other environment-specific references that are NOT cross-database
     # This is more conservative - only replace when we're sure it's safe
-    env_patterns = ['SIT', 'QA', 'UAT', 'PROD']
-    for env in env_patterns:
-        if env != target_env.upper():
-            # Only replace environment references that are part of database names
-            # NOT standalone environment references in other contexts
-            content = re.sub(rf'_{env}(?=_|\.|$)', f'_{target_env.upper()}', content)
+    # Only replace environment references that are part of database names
+    # NOT standalone environment references in other contexts
+    content = _rewrite_env_suffixes(_ENV_DB_SUFFIX_RE, content, target_env.upper())
     
     return content
 
 
-def extract_schemas(database, schemas, connection_config, role_map=None, output_dir="schemas", db_prefix=None, db_base=None):
-    """Extract DDL and grants for multiple schemas."""
-    results = []
+def extract_schemas(database, schemas, connection_config, role_map=None, output_dir="schemas", db_prefix=None, db_base=None, schema_subdirs=True):
+    """Extract DDL and grants for multiple schemas.
+    
+    Files go to output_dir/<schema>/ unless schema_subdirs is False, in which
+    case they are written straight into output_dir (single schema only, the
+    file names do not include the schema).
+    """
     role_map = role_map or {}
     
-    # Connect to Snowflake
+    # One timestamp per extraction run, shared by every schema's files
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    # Connect to Snowflake (imported here so the workflow CLI starts without loading the connector)
+    import snowflake.connector as sf
+    
     conn = sf.connect(**connection_config)
-    cursor = conn.cursor()
     
     try:
-        for schema in schemas:
-            # Create output directory
-            schema_dir = os.path.join(output_dir, schema)
-            os.makedirs(schema_dir, exist_ok=True)
-            
-            # Extract objects
-            ddl_statements = extract_schema_objects(cursor, database, schema)
-            
-            # Extract grants
-            grant_statements = extract_schema_grants(cursor, database, schema, role_map)
-            
-            # Determine source environment from database name
-            source_env = None
-            if '_' in database:
-                source_env = database.split('_')[-1]  # Extract SIT from PLATFORM_SIT
-            
-            # Smart templating: Only template references to the CURRENT database
-            templated_ddl = []
-            for ddl in ddl_statements:
-                templated_ddl.append(template_environment_references(
-                    ddl, source_env or 'SIT', '{{ENV}}', db_base
-                ))
-            
-            # Write DDL file
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            ddl_file = os.path.join(schema_dir, f"V1000__baseline_from_{database}.sql")
-            
-            with open(ddl_file, 'w') as f:
-                f.write(f"-- Exported from {database} at {timestamp}\n")
-                f.write("-- Environment references templated for multi-environment deployment\n")
-                f.write("-- NOTE: Only current database references are templated, cross-database references remain as-is\n")
-                if templated_ddl:
-                    f.write('\n'.join(templated_ddl))
-                else:
-                    f.write("-- No objects found in schema\n")
-            
-            # Write grants file
-            grant_file = os.path.join(schema_dir, f"V1001__grants_from_{database}.sql")
-            
-            with open(grant_file, 'w') as f:
-                f.write(f"-- Grants exported from {database} at {timestamp}\n")
-                f.write("-- Environment references templated for multi-environment deployment\n")
-                if grant_statements:
-                    f.write('\n'.join(grant_statements))
-                else:
-                    f.write("-- No grants found for schema\n")
-            
-            results.append({
-                'schema': schema,
-                'ddl_file': ddl_file,
-                'grant_file': grant_file,
-                'object_count': len(templated_ddl),
-                'grant_count': len(grant_statements)
-            })
+        # Schemas are independent, so extract them concurrently (one cursor per schema)
+        with ThreadPoolExecutor(max_workers=max(1, min(EXTRACT_SCHEMA_WORKERS, len(schemas)))) as executor:
+            futures = [
+                executor.submit(_extract_one_schema, conn, database, schema, role_map, output_dir, db_base, timestamp, schema_subdirs)
+                for schema in schemas
+            ]
+            results = [future.result() for future in futures]
             
     finally:
-        cursor.close()
         conn.close()
     
     return results
 
 
+def _extract_one_schema(conn, database, schema, role_map, output_dir, db_base, timestamp, schema_subdirs=True):
+    """Extract DDL and grants for one schema on its own cursor and write the files."""
+    cursor = conn.cursor()
+    
+    try:
+        # Create output directory
+        schema_dir = Path(output_dir, schema) if schema_subdirs else Path(output_dir)
+        schema_dir.mkdir(exist_ok=True)
+        
+        # Extract objects
+        ddl_statements = extract_schema_objects(cursor, database, schema)
+        
+        # Extract grants
+        grant_statements = extract_schema_grants(cursor, database, schema, role_map)
+    finally:
+        cursor.close()
+    
+    # Determine source environment from database name
+    source_env = None
+    if '_' in database:
+        source_env = database.split('_')[-1]  # Extract SIT from PLATFORM_SIT
+    
+    # Smart templating: Only template references to the CURRENT database
+    templated_ddl = []
+    for ddl in ddl_statements:
+        templated_ddl.append(template_environment_references(
+            ddl, source_env or 'SIT', '{{ENV}}', db_base
+        ))
+    
+    # Write DDL file
+    ddl_file = os.path.join(schema_dir, f"V1000__baseline_from_{database}.sql")
+    
+    with open(ddl_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(f"-- Exported from {database} at {timestamp}\n")
+        f.write("-- Environment references templated for multi-environment deployment\n")
+        f.write("-- NOTE: Only current database references are templated, cross-database references remain as-is\n")
+        if templated_ddl:
+            f.writelines(ddl + '\n' for ddl in templated_ddl)
+        else:
+            f.write("-- No objects found in schema\n")
+    
+    # Write grants file
+    grant_file = os.path.join(schema_dir, f"V1001__grants_from_{database}.sql")
+    
+    with open(grant_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(f"-- Grants exported from {database} at {timestamp}\n")
+        f.write("-- Environment references templated for multi-environment deployment\n")
+        if grant_statements:
+            f.writelines(grant + '\n' for grant in grant_statements)
+        else:
+            f.write("-- No grants found for schema\n")
+    
+    return {
+        'schema': schema,
+        'ddl_file': ddl_file,
+        'grant_file': grant_file,
+        'object_count': len(templated_ddl),
+        'grant_count': len(grant_statements)
+    }
+
+
 def extract_schema_objects(cursor, database, schema):
     """Extract DDL for all objects in a schema."""
     ddl_statements = []
@@ -149,25 +239,31 @@ def extract_schema_objects(cursor, database, schema):
     for obj_type, show_sql in object_types:
         try:
             cursor.execute(show_sql.format(db=database, schema=schema))
-            objects = rows_dict(cursor)
             
-            for obj in objects:
-                obj_name = obj.get("name")
-                if obj_name and is_user_defined_object(obj_name):
-                    try:
-                        # Get DDL
-                        cursor.execute(f"SELECT GET_DDL('{obj_type}', '{database}.{schema}.{obj_name}')")
-                        ddl = cursor.fetchone()[0]
-                        
-                        # Clean up DDL
-                        ddl = ddl.strip()
-                        if not ddl.endswith(';'):
-                            ddl += ';'
-                        
-                        ddl_statements.append(ddl)
-                        
-                    except Exception as e:
-                        print(f"  ⚠️  Could not extract {obj_type} {obj_name}: {e}")
+            # Only pull back names of user-defined objects (system objects filtered server-side)
+            cursor.execute(
+                f"SELECT \"name\" FROM TABLE(RESULT_SCAN('{cursor.sfqid}'))"
+                f" WHERE {USER_DEFINED_OBJECT_FILTER}"
+            )
+            names = [row.name for row in rows_ntuple(cursor) if row.name]
+            
+            # Fetch DDL in batches (one round-trip per batch, not per object)
+            for start in range(0, len(names), GET_DDL_BATCH_SIZE):
+                batch = names[start:start + GET_DDL_BATCH_SIZE]
+                ddls = fetch_ddl_batch(cursor, obj_type, database, schema, batch)
+                
+                # Keep SHOW order; UNION ALL results are unordered
+                for obj_name in batch:
+                    ddl = ddls.get(obj_name, '')
+                    if not ddl or ddl.startswith(DDL_ERROR_PREFIX):
+                        print(f"  ⚠️  Could not extract {obj_type} {obj_name}: {ddl[len(DDL_ERROR_PREFIX):] or 'no DDL returned'}")
+                        continue
+                    
+                    # Clean up DDL
+                    if not ddl.endswith(';'):
+                        ddl += ';'
+                    
+                    ddl_statements.append(ddl)
                         
         except Exception as e:
             # Object type might not exist in this version
@@ -184,29 +280,37 @@ def extract_schema_grants(cursor, database, schema, role_map=None):
     try:
         # Get schema grants
         cursor.execute(f"SHOW GRANTS ON SCHEMA {database}.{schema}")
-        grants = rows_dict(cursor)
+        
+        # Re-select the columns we use so the rows come back as an Arrow result
+        cursor.execute(
+            f"SELECT \"privilege\", \"grantee_name\", \"granted_to\", \"grant_option\""
+            f" FROM TABLE(RESULT_SCAN('{cursor.sfqid}'))"
+        )
+        grants = rows_ntuple(cursor)
         
         # Get essential privileges from config
         essential_privileges = get_essential_privileges()
         
+        # Constant parts of every grant statement for this schema - using correct template variables
+        schema_identifier = f"IDENTIFIER('{{{{ DB_PREFIX }}}}_{{{{ DB_BASE }}}}_{{{{ ENV }}}}.{schema}')"
+        statement_endings = (";", " WITH GRANT OPTION;")
+        
         for grant in grants:
-            privilege = grant.get("privilege")
-            grantee = grant.get("grantee_name")
-            granted_to = grant.get("granted_to")
-            grant_option = grant.get("grant_option")
+            privilege = grant.privilege
+            grantee = grant.grantee_name
+            granted_to = grant.granted_to
+            grant_option = grant.grant_option
             
             if privilege and grantee and granted_to:
                 # Apply role mapping
                 mapped_role = role_map.get(grantee, grantee)
                 
-                # Build grant statement - using correct template variables
-                grant_stmt = f"GRANT {privilege} ON SCHEMA IDENTIFIER('{{{{ DB_PREFIX }}}}_{{{{ DB_BASE }}}}_{{{{ ENV }}}}.{schema}') TO {granted_to} {mapped_role}"
-                
-                if str(grant_option).upper() == "TRUE":
-                    grant_stmt += " WITH GRANT OPTION"
-                
-                grant_stmt += ";"
-                grant_statements.append(grant_stmt)
+                # Build grant statement
+                with_grant_option = str(grant_option).upper() == "TRUE"
+                grant_statements.append(
+                    f"GRANT {privilege} ON SCHEMA {schema_identifier} TO {granted_to} {mapped_role}"
+                    f"{statement_endings[with_grant_option]}"
+                )
         
     except Exception as e:
         print(f"  ⚠️  Could not extract grants: {e}")
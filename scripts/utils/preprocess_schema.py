@@ -5,26 +5,86 @@ This script handles environment-specific references and database naming.
 """
 
 import argparse
+import mmap
 import sys
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from utils.connection import load_local_config
 
 
-def replace_template_variables(content, env, db_prefix, db_base):
+def build_template_replacements(env, db_prefix, db_base):
+    """Build the (placeholder, value) pairs used by replace_template_variables."""
+    env = env.upper()
+    return (
+        # Environment variables
+        ('{{ENV}}', env),
+        ('{{ ENV }}', env),
+        # Database variables
+        ('{{DB_PREFIX}}', db_prefix),
+        ('{{ DB_PREFIX }}', db_prefix),
+        ('{{DB_BASE}}', db_base),
+        ('{{ DB_BASE }}', db_base),
+    )
+
+
+def replace_template_variables(content, env, db_prefix, db_base, replacements=None):
     """Replace template variables in SQL content."""
-    # Replace environment variables
-    content = content.replace('{{ENV}}', env.upper())
-    content = content.replace('{{ ENV }}', env.upper())
+    if replacements is None:
+        replacements = build_template_replacements(env, db_prefix, db_base)
+    for placeholder, value in replacements:
+        content = content.replace(placeholder, value)
+    return content
+
+
+def render_template_bytes(buffer, byte_replacements):
+    """Replace template placeholders in a bytes-like buffer in a single pass.
     
-    # Replace database variables
-    content = content.replace('{{DB_PREFIX}}', db_prefix)
-    content = content.replace('{{ DB_PREFIX }}', db_prefix)
-    content = content.replace('{{DB_BASE}}', db_base)
-    content = content.replace('{{ DB_BASE }}', db_base)
+    byte_replacements maps placeholder bytes (e.g. b'{{ENV}}') to their
+    values; any other '{{ ... }}' text is left untouched.
+    """
+    parts = []
+    last = 0
+    pos = buffer.find(b'{{')
+    while pos != -1:
+        end = buffer.find(b'}}', pos + 2)
+        if end == -1:
+            break
+        value = byte_replacements.get(buffer[pos:end + 2])
+        if value is None:
+            # Not one of ours, keep scanning from the next character
+            pos = buffer.find(b'{{', pos + 1)
+            continue
+        parts.append(buffer[last:pos])
+        parts.append(value)
+        last = end + 2
+        pos = buffer.find(b'{{', last)
+    parts.append(buffer[last:])
+    return b''.join(parts)
+
+
+def _process_schema_file(sql_file, schema_path, output_path, byte_replacements):
+    """Render one SQL file into the output directory and return the output path."""
+    relative_path = sql_file.relative_to(schema_path)
     
-    return content
+    # Map the original file and substitute placeholders in one scan
+    with open(sql_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            processed_content = b''
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                processed_content = render_template_bytes(mm, byte_replacements)
+    
+    if b'\r' in processed_content:
+        # Match text-mode reads, which translate CRLF/CR line endings
+        processed_content = processed_content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    
+    # Write to output directory
+    output_file = output_path / relative_path
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_bytes(processed_content)
+    return output_file
 
 
 def preprocess_schema_files(schema_dir, env, db_prefix, db_base, output_dir=None):
@@ -42,26 +102,26 @@ def preprocess_schema_files(schema_dir, env, db_prefix, db_base, output_dir=None
         output_path = schema_path.parent / f"{schema_path.name}_processed"
         output_path.mkdir(exist_ok=True)
     
-    processed_files = []
+    # Files are handled as UTF-8 bytes, independent of the platform locale
+    byte_replacements = {
+        placeholder.encode('utf-8'): value.encode('utf-8')
+        for placeholder, value in build_template_replacements(env, db_prefix, db_base)
+    }
     
-    # Process all SQL files in the schema directory
-    for sql_file in schema_path.glob("*.sql"):
-        print(f"🔧 Processing: {sql_file.name}")
-        
-        # Read the original file
-        with open(sql_file, 'r') as f:
-            content = f.read()
-        
-        # Replace template variables
-        processed_content = replace_template_variables(content, env, db_prefix, db_base)
-        
-        # Write to output directory
-        output_file = output_path / sql_file.name
-        with open(output_file, 'w') as f:
-            f.write(processed_content)
-        
-        processed_files.append(str(output_file))
-        print(f"  ✅ Processed: {output_file}")
+    # Process all SQL files in the schema directory, keeping subfolder layout.
+    # Files are independent and mostly I/O, so process them on a thread pool;
+    # progress is printed from here, in file order, so output doesn't interleave.
+    sql_files = list(schema_path.rglob("*.sql"))
+    processed_files = []
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as executor:
+        output_files = executor.map(
+            lambda sql_file: _process_schema_file(sql_file, schema_path, output_path, byte_replacements),
+            sql_files
+        )
+        for sql_file, output_file in zip(sql_files, output_files):
+            print(f"🔧 Processing: {sql_file.relative_to(schema_path)}")
+            processed_files.append(str(output_file))
+            print(f"  ✅ Processed: {output_file}")
     
     return str(output_path), processed_files
 
@@ -27,6 +27,9 @@ ESSENTIAL_PRIVILEGES = {
     "USAGE", "OWNERSHIP", "MONITOR", "CREATE TABLE", "CREATE VIEW", "MODIFY"
 }
 
+# Name prefixes of system objects that are never extracted
+_SYSTEM_PREFIXES = ('SYSTEM$', 'INFORMATION_SCHEMA')
+
 def get_object_types():
     """Get the list of object types to extract."""
     return SCHEMA_OBJECT_TYPES
@@ -39,11 +42,18 @@ def get_essential_privileges():
     """Get essential privileges that should always be preserved."""
     return ESSENTIAL_PRIVILEGES
 
+def user_defined_object_filter(column='"name"'):
+    """SQL condition equivalent to is_user_defined_object for a name column."""
+    return " AND ".join(
+        f"NOT STARTSWITH(UPPER({column}), '{prefix}')" for prefix in _SYSTEM_PREFIXES
+    )
+
 def is_user_defined_object(obj_name):
     """Check if an object is user-defined (not system)."""
-    if not obj_name:
-        return False
-    
     # Filter out system objects
-    system_prefixes = ['SYSTEM$', 'INFORMATION_SCHEMA']
-    return not any(obj_name.upper().startswith(prefix) for prefix in system_prefixes)
+    return bool(obj_name) and not obj_name.upper().startswith(_SYSTEM_PREFIXES)
+
+def filter_user_defined_objects(names):
+    """Return the user-defined names from a list, in order (bulk is_user_defined_object)."""
+    prefixes = _SYSTEM_PREFIXES
+    return [name for name in names if name and not name.upper().startswith(prefixes)]
@@ -12,6 +12,12 @@ from .state_manager import WorkflowStateManager
 from .workflow_utils import WorkflowUtils
 
 
+def _list_sql_files(directory):
+    """List the .sql files directly inside a directory in a single scandir pass."""
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.name.endswith('.sql') and entry.is_file()]
+
+
 class CommitManager:
     """Manages committing approved schemas."""
     
@@ -25,9 +31,9 @@ class CommitManager:
     def commit_schema(self, schema_name, dry_run=False):
         """Commit the final schema version to the main schema directory."""
         
-        # Validate workflow state
-        if not self.state_manager.validate_state_transition("FINAL_GENERATED"):
-            current_state = self.state_manager.get_current_state()
+        # Validate workflow state (read the state file once for check and message)
+        current_state = self.state_manager.get_current_state()
+        if current_state != "FINAL_GENERATED":
             print(f"❌ ERROR: Workflow state is '{current_state}', not 'FINAL_GENERATED'")
             self.state_manager.show_workflow_help(schema_name)
             return False
@@ -39,7 +45,7 @@ class CommitManager:
             print(f"   python scripts/export_schema.py --workflow generate --schema {schema_name}")
             return False
         
-        final_files = list(self.final_dir.glob("*.sql"))
+        final_files = _list_sql_files(self.final_dir)
         if not final_files:
             print(f"❌ No final files found in: {self.final_dir}")
             return False
@@ -97,8 +103,9 @@ class CommitManager:
         for final_file in final_files:
             target_file = self.main_schema_dir / final_file.name
             
-            # Copy the file (Git handles version control)
-            shutil.copy2(final_file, target_file)
+            # Copy contents only (Git handles version control, metadata is not needed);
+            # copyfile uses the kernel's zero-copy path (sendfile) where available
+            shutil.copyfile(final_file, target_file)
             committed_files.append(target_file)
             print(f"📄 Committed: {final_file.name}")
         
@@ -124,12 +131,11 @@ class CommitManager:
         
         if current_state == "COMMITTED":
             # Show committed files
-            committed_files = list(self.main_schema_dir.glob("*.sql"))
+            committed_files = _list_sql_files(self.main_schema_dir)
             if committed_files:
                 print(f"\n✅ Committed Files:")
                 for file_path in committed_files:
-                    if not str(file_path).startswith(str(self.temp_dir)):
-                        print(f"   - {file_path.name}")
+                    print(f"   - {file_path.name}")
             
 
         else:
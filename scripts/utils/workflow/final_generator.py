@@ -2,15 +2,120 @@
 Generates final approved schema versions based on review decisions.
 """
 
-import json
+import mmap
 import os
+import re
 import shutil
 from pathlib import Path
 from datetime import datetime
 
+from . import json_io
 from .state_manager import WorkflowStateManager
 from .workflow_utils import WorkflowUtils
 
+_HEADER_FOOTER = (
+    "-- ==========================================\n"
+    "-- SCHEMA CONTENT BELOW\n"
+    "-- ==========================================\n\n"
+)
+
+
+def _list_sql_names(directory):
+    """Names of the .sql files in a directory, from a single scandir pass."""
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.name.endswith('.sql')]
+
+
+def _write_with_header(src_path, dst_path, header):
+    """Write header followed by the bytes of src_path to dst_path in one pass.
+    
+    The body is copied kernel-side with os.sendfile where available.
+    """
+    with open(dst_path, 'wb') as dst, open(src_path, 'rb') as src:
+        dst.write(header.encode('utf-8'))
+        dst.flush()
+        size = os.fstat(src.fileno()).st_size
+        try:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            if offset:
+                raise
+            # No sendfile on this platform/filesystem, copy through userspace
+            src.seek(0)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _compile_decisions(decisions):
+    """Build (accepted, pattern) for applying decisions to UTF-8 bytes.
+    
+    accepted maps each encoded original to its decision (the first accepted
+    decision for an original wins); pattern alternates the originals longest
+    first, or is None when nothing was accepted.
+    
+    All decisions are applied in one pass over the original text, unlike
+    chained str.replace calls: a longer original is not partially rewritten
+    by a shorter one it contains (DB_SIT_X stays whole when DB_SIT is also
+    accepted), and replacement text is never rewritten by a later decision.
+    """
+    accepted = {}
+    for decision in decisions:
+        if decision['decision'] == 'accept' and decision['original']:
+            accepted.setdefault(decision['original'].encode('utf-8'), decision)
+    if not accepted:
+        return accepted, None
+    
+    pattern = re.compile(b'|'.join(re.escape(original) for original in sorted(accepted, key=len, reverse=True)))
+    return accepted, pattern
+
+
+def _write_with_decisions(src_path, dst_path, accepted, pattern, make_header):
+    """Write make_header(applied_changes) then src_path with decisions applied; return applied_changes.
+    
+    The source is mmapped and scanned once; text between matches is written
+    straight from the mapping, so no decoded or substituted copy of the file
+    is built.
+    """
+    if pattern is None:
+        _write_with_header(src_path, dst_path, make_header([]))
+        return []
+    
+    with open(src_path, 'rb') as src:
+        if not os.fstat(src.fileno()).st_size:
+            # Empty files cannot be mapped and have nothing to substitute
+            Path(dst_path).write_bytes(make_header([]).encode('utf-8'))
+            return []
+        
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Locate every occurrence first: the header lists the changes that applied
+            matches = [(match.start(), match.end(), match.group()) for match in pattern.finditer(mm)]
+            matched = {original for _, _, original in matches}
+            applied_changes = [
+                {
+                    'original': decision['original'],
+                    'suggested': decision['suggested'],
+                    'context': decision['context'],
+                    'reason': decision['reason']
+                }
+                for original, decision in accepted.items() if original in matched
+            ]
+            replacements = {original: accepted[original]['suggested'].encode('utf-8') for original in matched}
+            
+            with open(dst_path, 'wb') as dst:
+                dst.write(make_header(applied_changes).encode('utf-8'))
+                last = 0
+                for start, end, original in matches:
+                    dst.write(mm[last:start])
+                    dst.write(replacements[original])
+                    last = end
+                dst.write(mm[last:])
+    
+    return applied_changes
+
 
 class FinalVersionGenerator:
     """Generates final approved schema versions."""
@@ -59,14 +164,14 @@ class FinalVersionGenerator:
             return True
         
         # Generate final version based on decisions
-        self._generate_final_with_decisions(schema_name, decisions)
+        final_names = self._generate_final_with_decisions(schema_name, decisions)
         
         # Show generation summary
         print(f"\n📋 GENERATION SUMMARY")
         print(f"Status: Final version generated")
         print(f"Schema: {schema_name}")
         print(f"Method: Based on {len(decisions)} review decisions")
-        print(f"Files: {len(list(self.final_dir.glob('*.sql')))} SQL files created")
+        print(f"Files: {len(final_names)} SQL files created")
         print(f"Location: {self.final_dir}")
         
         # Show next step
@@ -82,8 +187,7 @@ class FinalVersionGenerator:
             return []
         
         try:
-            with open(self.decisions_file, 'r') as f:
-                return json.load(f)
+            return json_io.loads(self.decisions_file.read_bytes())
         except Exception as e:
             print(f"⚠️  Could not load decisions: {e}")
             return []
@@ -91,6 +195,7 @@ class FinalVersionGenerator:
     def _generate_final_without_decisions(self, schema_name):
         """Generate final version when no decisions exist."""
         
+        generated_at = datetime.now().isoformat()
         self.final_dir.mkdir(parents=True, exist_ok=True)
         
         # Check if suggested versions exist and use them, otherwise fall back to raw
@@ -101,32 +206,25 @@ class FinalVersionGenerator:
                 shutil.copy2(sql_file, final_file)
         else:
             print(f"📄 Using raw versions (no templating)")
-            # Copy raw files to final directory
-            for sql_file in self.raw_dir.glob("*.sql"):
-                final_file = self.final_dir / sql_file.name
-                shutil.copy2(sql_file, final_file)
-            
-            # Add header comment
-            with open(final_file, 'r') as f:
-                content = f.read()
-            
             header = f"""-- FINAL VERSION: {schema_name} Schema
--- Generated at: {datetime.now().isoformat()}
+-- Generated at: {generated_at}
 -- Note: No templating decisions were made - using raw extraction
 -- ⚠️  This version may contain environment-specific references
 
 """
             
-            with open(final_file, 'w') as f:
-                f.write(header + content)
-            
-            print(f"📄 Final version generated: {final_file}")
+            # Copy raw files to final directory with the header comment prepended
+            for sql_file in self.raw_dir.glob("*.sql"):
+                final_file = self.final_dir / sql_file.name
+                _write_with_header(sql_file, final_file, header)
+                print(f"📄 Final version generated: {final_file}")
         
         # Update workflow state
+        final_names = _list_sql_names(self.final_dir)
         self.state_manager.update_state("FINAL_GENERATED", {
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': generated_at,
             'method': 'no_decisions',
-            'files_generated': [f.name for f in self.final_dir.glob("*.sql")]
+            'files_generated': final_names
         })
         
         # Show generation summary
@@ -134,7 +232,7 @@ class FinalVersionGenerator:
         print(f"Status: Final version generated")
         print(f"Schema: {schema_name}")
         print(f"Method: No review decisions - using raw extraction")
-        print(f"Files: {len(list(self.final_dir.glob('*.sql')))} SQL files created")
+        print(f"Files: {len(final_names)} SQL files created")
         print(f"Location: {self.final_dir}")
         
         # Show next step
@@ -145,44 +243,31 @@ class FinalVersionGenerator:
     def _generate_final_with_decisions(self, schema_name, decisions):
         """Generate final version based on review decisions."""
         
+        generated_at = datetime.now().isoformat()
         self.final_dir.mkdir(parents=True, exist_ok=True)
         
         # Group decisions by file
         file_decisions = self._group_decisions_by_file(decisions)
         
+        # Files normally share one decision list, so compile each list only once
+        compiled = {}
+        
         # Process each SQL file
         for sql_file in self.raw_dir.glob("*.sql"):
             final_file = self.final_dir / sql_file.name
-            
-            # Load original content
-            with open(sql_file, 'r') as f:
-                content = f.read()
-            
-            # Apply accepted decisions for this file
-            applied_changes = []
             file_name = sql_file.name
             
-            if file_name in file_decisions:
-                for decision in file_decisions[file_name]:
-                    if decision['decision'] == 'accept':
-                        # Apply the change
-                        original_count = content.count(decision['original'])
-                        content = content.replace(decision['original'], decision['suggested'])
-                        new_count = content.count(decision['suggested'])
-                        
-                        if new_count > 0:
-                            applied_changes.append({
-                                'original': decision['original'],
-                                'suggested': decision['suggested'],
-                                'context': decision['context'],
-                                'reason': decision['reason']
-                            })
-            
-            # Write final version with header
-            header = self._generate_final_header(schema_name, file_name, applied_changes)
+            # Apply accepted decisions for this file while streaming it to the final version
+            file_decision_list = file_decisions.get(file_name, ())
+            key = id(file_decision_list)
+            if key not in compiled:
+                compiled[key] = _compile_decisions(file_decision_list)
+            accepted_originals, pattern = compiled[key]
             
-            with open(final_file, 'w') as f:
-                f.write(header + content)
+            applied_changes = _write_with_decisions(
+                sql_file, final_file, accepted_originals, pattern,
+                lambda changes: self._generate_final_header(schema_name, file_name, changes, generated_at)
+            )
             
             print(f"📄 Final version generated: {final_file}")
             if applied_changes:
@@ -191,75 +276,75 @@ class FinalVersionGenerator:
                 print(f"   No changes applied (using raw version)")
         
         # Update workflow state
+        accepted, rejected, _ = WorkflowUtils.partition_decisions(decisions)
+        final_names = _list_sql_names(self.final_dir)
         self.state_manager.update_state("FINAL_GENERATED", {
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': generated_at,
             'method': 'with_decisions',
             'total_decisions': len(decisions),
-            'accepted_decisions': len([d for d in decisions if d['decision'] == 'accept']),
-            'files_generated': [f.name for f in self.final_dir.glob("*.sql")]
+            'accepted_decisions': len(accepted),
+            'files_generated': final_names
         })
         
         # Show summary
-        self._show_generation_summary(decisions)
+        self._show_generation_summary(decisions, accepted, rejected)
         
         print(f"\n✅ Final version generated based on {len(decisions)} decisions")
         print(f"📁 Final files: {self.final_dir}")
         print(f"🚀 Next: Review final version and commit if satisfied")
+        
+        return final_names
     
     def _group_decisions_by_file(self, decisions):
         """Group decisions by the file they apply to."""
-        file_decisions = {}
+        # For now, assume all decisions apply to all files
+        # In the future, we could make this more sophisticated
+        # by analyzing which files contain which references
         
-        for decision in decisions:
-            # For now, assume all decisions apply to all files
-            # In the future, we could make this more sophisticated
-            # by analyzing which files contain which references
-            
-            # Get all SQL files
-            for sql_file in self.raw_dir.glob("*.sql"):
-                file_name = sql_file.name
-                if file_name not in file_decisions:
-                    file_decisions[file_name] = []
-                file_decisions[file_name].append(decision)
+        # Get all SQL files (one directory scan, not one per decision)
+        with os.scandir(self.raw_dir) as entries:
+            sql_names = [entry.name for entry in entries if entry.is_file() and entry.name.endswith('.sql')]
+        
+        # Every file references the same list; callers only read from it
+        shared_decisions = list(decisions)
+        file_decisions = dict.fromkeys(sql_names, shared_decisions)
         
         return file_decisions
     
-    def _generate_final_header(self, schema_name, file_name, applied_changes):
+    def _generate_final_header(self, schema_name, file_name, applied_changes, generated_at):
         """Generate header for final version file."""
         
-        header = f"""-- FINAL VERSION: {schema_name} Schema
+        parts = [f"""-- FINAL VERSION: {schema_name} Schema
 -- File: {file_name}
--- Generated at: {datetime.now().isoformat()}
+-- Generated at: {generated_at}
 -- Based on: {len(applied_changes)} templating decisions
 
-"""
+"""]
         
+        # Collect fragments and join once instead of growing a string
         if applied_changes:
-            header += "-- APPLIED TEMPLATING CHANGES:\n"
+            parts.append("-- APPLIED TEMPLATING CHANGES:\n")
             for i, change in enumerate(applied_changes, 1):
-                header += f"-- {i}. {change['original']} → {change['suggested']}\n"
-                header += f"--    Context: {change['context']}\n"
-                header += f"--    Reason: {change['reason']}\n"
-            header += "\n"
+                parts.append(
+                    f"-- {i}. {change['original']} → {change['suggested']}\n"
+                    f"--    Context: {change['context']}\n"
+                    f"--    Reason: {change['reason']}\n"
+                )
+            parts.append("\n")
         else:
-            header += "-- No templating changes applied - using raw extraction\n\n"
+            parts.append("-- No templating changes applied - using raw extraction\n\n")
         
-        header += "-- ==========================================\n"
-        header += "-- SCHEMA CONTENT BELOW\n"
-        header += "-- ==========================================\n\n"
+        parts.append(_HEADER_FOOTER)
         
-        return header
+        return ''.join(parts)
     
-    def _show_generation_summary(self, decisions):
+    def _show_generation_summary(self, decisions, accepted, rejected):
         """Show summary of final version generation."""
         
         if not decisions:
             print(f"\n📊 Generation Summary: No decisions to apply")
             return
         
-        accepted = [d for d in decisions if d['decision'] == 'accept']
-        rejected = [d for d in decisions if d['decision'] == 'reject']
-        
         print(f"\n📊 FINAL VERSION SUMMARY")
         print(f"Total Decisions: {len(decisions)}")
         print(f"✅ Applied Changes: {len(accepted)}")
@@ -282,7 +367,8 @@ class FinalVersionGenerator:
         if not self.final_dir.exists():
             return []
         
-        return [f for f in self.final_dir.glob("*.sql")]
+        with os.scandir(self.final_dir) as entries:
+            return [Path(entry.path) for entry in entries if entry.name.endswith('.sql')]
     
     def is_final_generated(self):
         """Check if final version has been generated."""
@@ -304,8 +390,9 @@ class FinalVersionGenerator:
             print(f"\n📄 {final_file.name}:")
             
             # Show first few lines as preview
-            with open(final_file, 'r') as f:
-                lines = f.readlines()[:10]  # First 10 lines
+            with open(final_file, 'r', encoding='utf-8') as f:
+                # First 10 lines, without reading the rest of the file
+                lines = [line for line in (f.readline() for _ in range(10)) if line]
             
             for line in lines:
                 if line.strip():
@@ -2,15 +2,38 @@
 Interactive review of templating suggestions with human decision making.
 """
 
-import json
+import mmap
 import os
+import re
 from pathlib import Path
 from datetime import datetime
 
+from . import json_io
 from .state_manager import WorkflowStateManager
 from .workflow_utils import WorkflowUtils
 
 
+# Markdown headers of the analysis report ("## ...", "### ..."), matched on the mmapped bytes
+_SECTION_HEADER_RE = re.compile(rb'^#+ (.+)$', re.MULTILINE)
+
+# Lines of a report section: "1. **ORIG** → **SUGGESTED**", "- Context: `...`", "- Reason: ..."
+_SUGGESTION_LINE_RE = re.compile(
+    r'^[ \t]*\d+\. (?P<original>.+?) → (?P<suggested>.+?)[ \t]*$'
+    r'|^[ \t]*- Context:[ \t]*(?P<context>.*?)[ \t]*$'
+    r'|^[ \t]*- Reason:[ \t]*(?P<reason>.*?)[ \t]*$',
+    re.MULTILINE
+)
+
+# Answer -> decision for the review prompt; Enter takes the recommended option
+_SAFE_CHOICES = {
+    '': 'accept', 'y': 'accept', 'yes': 'accept',
+    'n': 'reject', 'no': 'reject',
+    'q': 'quit', 'quit': 'quit',
+    'h': 'help', 'help': 'help'
+}
+_UNSAFE_CHOICES = {**_SAFE_CHOICES, '': 'reject'}
+
+
 class InteractiveReviewer:
     """Interactive review of templating suggestions."""
     
@@ -20,6 +43,7 @@ class InteractiveReviewer:
         self.suggested_dir = self.temp_dir / "suggested"
         self.state_manager = WorkflowStateManager(temp_dir)
         self.decisions_file = self.temp_dir / "decisions.json"
+        self._section_index = []
     
     def start_review(self, schema_name):
         """Start the interactive review process."""
@@ -43,7 +67,7 @@ class InteractiveReviewer:
         
         # Check required files after analysis
         raw_dir = Path(self.temp_dir) / "raw"
-        if not raw_dir.exists() or not list(raw_dir.glob("*.sql")):
+        if not raw_dir.exists() or not any(raw_dir.glob("*.sql")):
             print(f"❌ ERROR: No raw SQL files found in {raw_dir}")
             print(f"🔄 Extraction may be incomplete. Restart extraction:")
             print(f"   python scripts/export_schema.py --workflow extract --schema {schema_name}")
@@ -113,81 +137,70 @@ class InteractiveReviewer:
     
     def _parse_analysis_report(self, analysis_file):
         """Parse the analysis report to extract suggestions."""
-        with open(analysis_file, 'r') as f:
-            content = f.read()
+        # Map the report and decode only the sections we parse
+        with open(analysis_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                # Index every markdown header once; sections are then O(1) lookups
+                self._section_index = [
+                    (m.start(), m.group(1).decode('utf-8'))
+                    for m in _SECTION_HEADER_RE.finditer(content)
+                ]
+                safe_section = self._extract_section(content, "Safe to Template")
+                unsafe_section = self._extract_section(content, "Needs Manual Review")
         
         suggestions = []
         
         # Parse safe suggestions
-        safe_section = self._extract_section(content, "Safe to Template")
         if safe_section:
             suggestions.extend(self._parse_suggestions_from_section(safe_section, True))
         
         # Parse unsafe suggestions
-        unsafe_section = self._extract_section(content, "Needs Manual Review")
         if unsafe_section:
             suggestions.extend(self._parse_suggestions_from_section(unsafe_section, False))
         
         return suggestions
     
     def _extract_section(self, content, section_name):
-        """Extract a section from the markdown content."""
-        start_marker = f"### {section_name}"
-        end_marker = "### "
-        
-        start_pos = content.find(start_marker)
-        if start_pos == -1:
+        """Extract a section (up to the next header) from the indexed markdown content as text."""
+        for i, (start_pos, title) in enumerate(self._section_index):
+            if section_name in title:
+                break
+        else:
             return None
         
-        end_pos = content.find(end_marker, start_pos + len(start_marker))
-        if end_pos == -1:
+        if i + 1 == len(self._section_index):
             # Section goes to end of file
-            return content[start_pos:]
+            return content[start_pos:].decode('utf-8')
         
-        return content[start_pos:end_pos]
+        return content[start_pos:self._section_index[i + 1][0]].decode('utf-8')
     
     def _parse_suggestions_from_section(self, section_content, is_safe):
         """Parse suggestions from a section of the analysis report."""
         suggestions = []
-        
-        # Look for numbered suggestions
-        lines = section_content.split('\n')
         current_suggestion = None
         
-        for line in lines:
-            line = line.strip()
-            
-            # Check if this is a new suggestion (numbered line)
-            if line and line[0].isdigit() and '. ' in line:
-                # Save previous suggestion if exists
-                if current_suggestion:
-                    suggestions.append(current_suggestion)
-                
+        # One scan over the section: numbered suggestion lines and their Context/Reason lines
+        for m in _SUGGESTION_LINE_RE.finditer(section_content):
+            if m['original'] is not None:
                 # Start new suggestion
-                parts = line.split(' → ')
-                if len(parts) == 2:
-                    original = parts[0].split('. ')[1].strip('*')
-                    suggested = parts[1].strip('*')
-                    
-                    current_suggestion = {
-                        'type': 'database_reference',
-                        'original': original,
-                        'suggested': suggested,
-                        'is_safe': is_safe,
-                        'context': '',
-                        'reason': '',
-                        'risk_level': 'LOW' if is_safe else 'MEDIUM'
-                    }
+                current_suggestion = {
+                    'type': 'database_reference',
+                    'original': m['original'].strip('*'),
+                    'suggested': m['suggested'].strip('*'),
+                    'is_safe': is_safe,
+                    'context': '',
+                    'reason': '',
+                    'risk_level': 'LOW' if is_safe else 'MEDIUM'
+                }
+                suggestions.append(current_suggestion)
             
             # Extract context and reason from subsequent lines
-            elif current_suggestion and line.startswith('- Context:'):
-                current_suggestion['context'] = line.split('Context:')[1].strip().strip('`')
-            elif current_suggestion and line.startswith('- Reason:'):
-                current_suggestion['reason'] = line.split('Reason:')[1].strip()
-        
-        # Add last suggestion
-        if current_suggestion:
-            suggestions.append(current_suggestion)
+            elif current_suggestion and m['context'] is not None:
+                current_suggestion['context'] = m['context'].strip('`')
+            elif current_suggestion and m['reason'] is not None:
+                current_suggestion['reason'] = m['reason']
         
         return suggestions
     
@@ -210,46 +223,25 @@ class InteractiveReviewer:
             print("  [n] Reject")
             print("  [q] Quit review")
             print("  [h] Help")
-            
-            while True:
-                choice = input("Accept this suggestion? [Y/n/q/h]: ").strip().lower()
-                
-                if choice in ['', 'y', 'yes']:
-                    decision = 'accept'
-                    break
-                elif choice in ['n', 'no']:
-                    decision = 'reject'
-                    break
-                elif choice in ['q', 'quit']:
-                    decision = 'quit'
-                    break
-                elif choice in ['h', 'help']:
-                    self._show_help()
-                else:
-                    print("Invalid choice. Please enter Y, n, q, or h.")
+            choices, prompt, hint = _SAFE_CHOICES, "Accept this suggestion? [Y/n/q/h]: ", "Y, n, q, or h"
         else:
             print("Options:")
             print("  [y] Accept (use with caution)")
             print("  [N] Reject (recommended - needs review)")
             print("  [q] Quit review")
             print("  [h] Help")
+            choices, prompt, hint = _UNSAFE_CHOICES, "Accept this suggestion? [y/N/q/h]: ", "y, N, q, or h"
+        
+        # One dict lookup per answer; only loop again on help or invalid input
+        while True:
+            decision = choices.get(input(prompt).strip().lower())
             
-            while True:
-                choice = input("Accept this suggestion? [y/N/q/h]: ").strip().lower()
-                
-                if choice in ['y', 'yes']:
-                    decision = 'accept'
-                    break
-                elif choice in ['', 'n', 'no']:
-                    decision = 'reject'
-                    break
-                elif choice in ['q', 'quit']:
-                    decision = 'quit'
-                    break
-                elif choice in ['h', 'help']:
-                    self._show_help()
-                else:
-                    print("Invalid choice. Please enter y, N, q, or h.")
+            if decision == 'help':
+                self._show_help()
+            elif decision is not None:
+                break
+            else:
+                print(f"Invalid choice. Please enter {hint}.")
         
         # Record decision
         decision_record = {
@@ -313,24 +305,25 @@ DECISION GUIDANCE:
         # Save decisions (silently)
         self._save_decisions(decisions)
         
+        accepted, rejected, quit_early = WorkflowUtils.partition_decisions(decisions)
+        
         # Update workflow state
         self.state_manager.update_state("REVIEW_COMPLETE", {
             'reviewed_at': datetime.now().isoformat(),
             'total_suggestions': len(decisions),
-            'accepted': len([d for d in decisions if d['decision'] == 'accept']),
-            'rejected': len([d for d in decisions if d['decision'] == 'reject']),
-            'quit_early': any(d['decision'] == 'quit' for d in decisions)
+            'accepted': len(accepted),
+            'rejected': len(rejected),
+            'quit_early': quit_early
         })
         
         # Show summary
-        self._show_review_summary(decisions)
+        self._show_review_summary(decisions, accepted, rejected)
     
     def _save_decisions(self, decisions):
         """Save review decisions to file."""
-        with open(self.decisions_file, 'w') as f:
-            json.dump(decisions, f, indent=2)
+        self.decisions_file.write_bytes(json_io.dumps(decisions))
     
-    def _show_review_summary(self, decisions):
+    def _show_review_summary(self, decisions, accepted, rejected):
         """Show summary of review decisions."""
         print(f"\n📋 REVIEW SUMMARY")
         
@@ -342,9 +335,6 @@ DECISION GUIDANCE:
             print(f"Result: Review complete")
             return
         
-        accepted = [d for d in decisions if d['decision'] == 'accept']
-        rejected = [d for d in decisions if d['decision'] == 'reject']
-        
         print(f"Status: Review complete")
         print(f"Analysis: {len(decisions)} suggestions found")
         print(f"Report: {self.temp_dir}/analysis/templating_analysis.md")
@@ -369,8 +359,7 @@ DECISION GUIDANCE:
         if not self.decisions_file.exists():
             return []
         
-        with open(self.decisions_file, 'r') as f:
-            return json.load(f)
+        return json_io.loads(self.decisions_file.read_bytes())
     
     def is_review_complete(self):
         """Check if review is complete."""
@@ -0,0 +1,31 @@
+"""
+JSON serialization for workflow files, using orjson when it is installed.
+"""
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+
+if orjson is not None:
+    def dumps(obj):
+        """Serialize obj to UTF-8 JSON bytes, indented by two spaces."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    
+    def dumps_compact(obj):
+        """Serialize obj to UTF-8 JSON bytes without whitespace."""
+        return orjson.dumps(obj)
+    
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        """Serialize obj to UTF-8 JSON bytes, indented by two spaces."""
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    def dumps_compact(obj):
+        """Serialize obj to UTF-8 JSON bytes without whitespace."""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    loads = json.loads
@@ -3,13 +3,13 @@ Safe schema extraction with temporary files and workflow state management.
 """
 
 import os
-import shutil
 import tempfile
 from pathlib import Path
 from datetime import datetime
 
 from ..extraction import extract_schemas
 from .state_manager import WorkflowStateManager
+from .workflow_utils import WorkflowUtils
 
 
 class SafeSchemaExtractor:
@@ -27,8 +27,9 @@ class SafeSchemaExtractor:
         """Extract schema safely to temporary directory."""
         
         # AUTO-CLEAN: Remove any existing temp files and reset workflow state
+        # (moved aside instantly; the old files are deleted while extraction runs)
         if self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir)
+            WorkflowUtils.remove_tree_in_background(self.temp_dir)
         
         # Create fresh temp structure
         temp_structure = {
@@ -54,7 +55,8 @@ class SafeSchemaExtractor:
                 connection_config=self.connection_config,
                 output_dir=str(temp_structure['raw']),
                 db_prefix=db_prefix,
-                db_base=db_base
+                db_base=db_base,
+                schema_subdirs=False
             )
             
             if not results:
@@ -66,26 +68,16 @@ class SafeSchemaExtractor:
                 # Check if this is due to schema not existing or access denied
                 raise Exception(f"Schema '{self.database}.{self.schema_name}' not found or access denied. No objects or grants extracted.")
             
-            # Move extracted files to raw directory
-            for result in results:
-                # Move DDL file
-                ddl_file = Path(result['ddl_file'])
-                if ddl_file.exists():
-                    new_ddl_file = temp_structure['raw'] / ddl_file.name
-                    shutil.move(str(ddl_file), str(new_ddl_file))
-                
-                # Move grants file
-                grant_file = Path(result['grant_file'])
-                if grant_file.exists():
-                    new_grant_file = temp_structure['raw'] / grant_file.name
-                    shutil.move(str(grant_file), str(new_grant_file))
+            # Files were written straight into the raw directory, so the results
+            # already name every extracted file (no move, no directory re-scan)
+            sql_files = [path for result in results for path in (result['ddl_file'], result['grant_file'])]
             
             # Update workflow state
             self.state_manager.update_state("EXTRACTION_COMPLETE", {
                 'extracted_at': datetime.now().isoformat(),
                 'database': self.database,
                 'schema': self.schema_name,
-                'files': [str(f) for f in temp_structure['raw'].glob("*.sql")]
+                'files': sql_files
             })
             
             # Show extraction summary
@@ -93,7 +85,7 @@ class SafeSchemaExtractor:
             print(f"Status: Extraction complete")
             print(f"Schema: {self.schema_name}")
             print(f"Database: {self.database}")
-            print(f"Files: {len(list(temp_structure['raw'].glob('*.sql')))} SQL files extracted")
+            print(f"Files: {len(sql_files)} SQL files extracted")
             print(f"Location: {self.temp_dir}")
             
             return True
@@ -102,7 +94,7 @@ class SafeSchemaExtractor:
             print(f"❌ Extraction failed: {e}")
             # Clean up on failure
             if self.temp_dir.exists():
-                shutil.rmtree(self.temp_dir)
+                WorkflowUtils.remove_tree_in_background(self.temp_dir)
             return False
     
     def get_temp_structure(self):
@@ -117,7 +109,7 @@ class SafeSchemaExtractor:
     def cleanup(self):
         """Clean up temporary files."""
         if self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir)
+            WorkflowUtils.remove_tree_in_background(self.temp_dir)
             print(f"🧹 Cleaned temporary files for {self.schema_name}")
     
     def is_extraction_complete(self):
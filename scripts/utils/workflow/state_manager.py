@@ -2,10 +2,10 @@
 Workflow state management for schema extraction and templating workflow.
 """
 
-import json
 import os
 from datetime import datetime
 from pathlib import Path
+from . import json_io
 
 
 class WorkflowStateManager:
@@ -37,21 +37,39 @@ class WorkflowStateManager:
     def __init__(self, temp_dir):
         self.temp_dir = Path(temp_dir)
         self.state_file = self.temp_dir / "workflow_state.json"
+        # (mtime_ns, size) of the state file -> parsed current_step
+        self._state_cache = None
     
     def get_current_state(self):
         """Get current workflow state."""
-        if not self.state_file.exists():
+        try:
+            stat = os.stat(self.state_file)
+        except FileNotFoundError:
             return "NOT_STARTED"
         
+        # Repeated checks only re-read the file when it has changed on disk
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._state_cache is not None and self._state_cache[0] == key:
+            return self._state_cache[1]
+        
         try:
-            with open(self.state_file, 'r') as f:
-                state = json.load(f)
-                return state.get('current_step', 'UNKNOWN')
+            state = json_io.loads(self.state_file.read_bytes())
+            current_step = state.get('current_step', 'UNKNOWN')
         except Exception:
             return 'UNKNOWN'
+        
+        self._state_cache = (key, current_step)
+        return current_step
     
-    def update_state(self, step, details=None):
-        """Update workflow state."""
+    def update_state(self, step, details=None, force=False):
+        """Update workflow state.
+        
+        Re-recording the current step without details is skipped (only
+        last_updated would change) unless force is set.
+        """
+        if not force and details is None and self.state_file.exists() and self.get_current_state() == step:
+            return
+        
         self.state_file.parent.mkdir(parents=True, exist_ok=True)
         
         state = {
@@ -60,8 +78,11 @@ class WorkflowStateManager:
             'details': details or {}
         }
         
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.state_file.write_bytes(json_io.dumps_compact(state))
+        
+        # Seed the cache with what we just wrote so the next check needs no parse
+        stat = os.stat(self.state_file)
+        self._state_cache = ((stat.st_mtime_ns, stat.st_size), step)
     
     def validate_state_transition(self, expected_state):
         """Validate current state allows the requested operation."""
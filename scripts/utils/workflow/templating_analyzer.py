@@ -4,10 +4,131 @@ Analyzes DDL content for templating opportunities and generates analysis reports
 
 import re
 import os
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
 from pathlib import Path
 from datetime import datetime
 
 
+# Per-file analysis runs in worker processes once a schema has this many files
+ANALYZE_PARALLEL_MIN_FILES = 4
+ANALYZE_WORKERS = os.cpu_count() or 1
+
+# All patterns below are bytes patterns: SQL files are scanned as read from disk,
+# and only the short texts that end up in suggestions/reports are decoded.
+
+# Database names whose environment suffix can be templated (e.g., STAGING_SIT, RAW_SIT)
+_DB_ENV_NAMES = ['STAGING', 'RAW', 'PROD', 'PREPARE', 'PLATFORM', 'CONSUME']
+
+# One pass finds database/environment references (groups 1-2, e.g. STAGING_SIT) and
+# role references (group 3, e.g. ROLE_APP_CONSUME_SIT). Matches are zero-width so the
+# two kinds may overlap; callers keep each pattern's matches non-overlapping.
+_CANDIDATE_SCAN_RE = re.compile(
+    (r'(?=((' + '|'.join(_DB_ENV_NAMES) + r')_[A-Z]+)|(ROLE_[A-Z_]+_[A-Z]+))').encode(),
+    re.IGNORECASE
+)
+
+# Identifier following FROM/JOIN/UPDATE (DELETE FROM is covered by FROM) - safe context.
+# The identifier is captured in a lookahead so a keyword used as an identifier
+# ("JOIN JOIN x") does not hide the next match.
+_FROM_JOIN_RE = re.compile(rb'(?:FROM|JOIN|UPDATE)\s+(?=([A-Z_]+))', re.IGNORECASE)
+
+# Identifier following CREATE TABLE/VIEW, ALTER TABLE, DROP TABLE - table/view name context
+_TABLE_DDL_RE = re.compile(rb'(?:CREATE\s+(?:TABLE|VIEW)|ALTER\s+TABLE|DROP\s+TABLE)\s+(?=([A-Z_]+))', re.IGNORECASE)
+
+# References like OTHER_DB.schema.table
+_CROSS_DB_RE = re.compile(rb'([A-Z_]+)\.([A-Z_]+)\.([A-Z_]+)')
+
+# Quotes not preceded by a backslash
+_SINGLE_QUOTE_RE = re.compile(rb"(?<!\\)'")
+_DOUBLE_QUOTE_RE = re.compile(rb'(?<!\\)"')
+
+# Hardcoded environment names and dynamic SQL execution patterns reported as warnings
+_ENV_NAMES = ['SIT', 'DEV', 'QA', 'UAT', 'PROD']
+_SQL_INJECTION_PATTERNS = [
+    r'EXEC\s*\(',
+    r'EXECUTE\s*\(',
+    r'EXECUTE\s+IMMEDIATE'
+]
+
+# One pass for both warning kinds: group 1 is an environment name (case-sensitive),
+# groups 2+ are the _SQL_INJECTION_PATTERNS in order (case-insensitive).
+# Environment names must stand alone or be delimited by '_' / punctuation, so
+# PLATFORM_SIT counts but DEVELOPMENT or PRODUCT do not (\b would treat '_' as a
+# word character and miss the suffixes this warning is about).
+_WARNING_SCAN_RE = re.compile((
+    '(?=(?<![A-Za-z0-9])(' + '|'.join(_ENV_NAMES) + ')(?![A-Za-z0-9])|'
+    + '|'.join(f'((?i:{p}))' for p in _SQL_INJECTION_PATTERNS) + ')'
+).encode())
+
+
+def _quote_offsets(content):
+    """Sorted offsets of unescaped single and double quotes in content."""
+    return (
+        [m.start() for m in _SINGLE_QUOTE_RE.finditer(content)],
+        [m.start() for m in _DOUBLE_QUOTE_RE.finditer(content)]
+    )
+
+
+def _apply_suggestions(content, suggestions):
+    """Replace every suggestion's original (case-insensitive) in one pass over bytes content.
+    
+    Originals are alternated longest first, so a longer reference is not
+    partially rewritten by a shorter one it contains; the first suggestion
+    for an original wins.
+    """
+    replacements = {}
+    for suggestion in suggestions:
+        replacements.setdefault(suggestion['original'].encode().lower(), suggestion['suggested'].encode())
+    if not replacements:
+        return content
+    
+    pattern = re.compile(
+        b'|'.join(re.escape(original) for original in sorted(replacements, key=len, reverse=True)),
+        re.IGNORECASE
+    )
+    return pattern.sub(lambda match: replacements[match.group(0).lower()], content)
+
+
+def _list_sql_files(directory):
+    """Paths of the .sql files in a directory, from a single scandir pass."""
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.name.endswith('.sql') and entry.is_file()]
+
+
+def _merge_duplicate_suggestions(suggestions):
+    """Collapse suggestions with the same original, replacement and verdict.
+    
+    The first occurrence (and its context/position) is kept with an
+    'occurrences' count; order of first occurrence is preserved.
+    """
+    merged = {}
+    for suggestion in suggestions:
+        key = (suggestion['original'], suggestion['suggested'], suggestion['is_safe'], suggestion['reason'])
+        existing = merged.get(key)
+        if existing is None:
+            suggestion['occurrences'] = 1
+            merged[key] = suggestion
+        else:
+            existing['occurrences'] += 1
+    return list(merged.values())
+
+
+def _occurrences_line(suggestion):
+    """Report line for a suggestion that occurs more than once (empty otherwise)."""
+    if suggestion.get('occurrences', 1) > 1:
+        return f"   - Occurrences: {suggestion['occurrences']}\n"
+    return ""
+
+
+def _follows_keyword(keyword_re, match_text, context):
+    """Check if match_text starts an identifier captured by keyword_re in (bytes) context."""
+    match_upper = match_text.upper().encode()
+    return any(m.group(1).upper().startswith(match_upper) for m in keyword_re.finditer(context))
+
+
 class TemplatingAnalyzer:
     """Analyzes DDL for safe templating opportunities."""
     
@@ -16,6 +137,7 @@ class TemplatingAnalyzer:
         self.raw_dir = self.temp_dir / "raw"
         self.analysis_dir = self.temp_dir / "analysis"
         self.suggested_dir = self.temp_dir / "suggested"
+        self._db_ref_re = None
     
     def analyze_schema_files(self, db_base=None):
         """Analyze all SQL files in the raw directory."""
@@ -33,9 +155,11 @@ class TemplatingAnalyzer:
             'summary': {}
         }
         
-        # Analyze each SQL file
-        for sql_file in self.raw_dir.glob("*.sql"):
-            file_analysis = self._analyze_sql_file(sql_file, db_base)
+        # Database references like PLATFORM_SIT, ALTO_SIT - compiled once for all files
+        self._db_ref_re = re.compile(re.escape(db_base).encode() + rb'_[A-Z]+', re.IGNORECASE) if db_base else None
+        
+        # Analyze each SQL file (in parallel worker processes when there are enough of them)
+        for file_analysis in self._analyze_files(_list_sql_files(self.raw_dir), db_base):
             analysis_results['files_analyzed'].append(file_analysis)
             
             # Aggregate suggestions
@@ -52,13 +176,34 @@ class TemplatingAnalyzer:
         # Generate suggested templated versions
         self._generate_suggested_versions(analysis_results)
         
+        for file_analysis in analysis_results['files_analyzed']:
+            del file_analysis['_content']
+        
         return analysis_results
     
+    def _analyze_files(self, sql_files, db_base):
+        """Analyze SQL files, returning their analyses in file order."""
+        workers = min(ANALYZE_WORKERS, len(sql_files))
+        
+        # Regex analysis is CPU-bound, so only processes help; for a couple of
+        # files the pool start-up costs more than it saves
+        if len(sql_files) >= ANALYZE_PARALLEL_MIN_FILES and workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    return list(executor.map(self._analyze_sql_file, sql_files, repeat(db_base)))
+            except (OSError, BrokenProcessPool):
+                # No usable process pool here (e.g. restricted sandbox); analyze in-process
+                pass
+        
+        return [self._analyze_sql_file(sql_file, db_base) for sql_file in sql_files]
+    
     def _analyze_sql_file(self, sql_file, db_base):
         """Analyze a single SQL file for templating opportunities."""
         
-        with open(sql_file, 'r') as f:
-            content = f.read()
+        # Scanned as bytes; universal newlines are applied here as text mode would
+        content = sql_file.read_bytes()
+        if b'\r' in content:
+            content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
         
         file_analysis = {
             'file_name': sql_file.name,
@@ -66,57 +211,72 @@ class TemplatingAnalyzer:
             'suggestions': [],
             'cross_db_refs': [],
             'warnings': [],
-            'risk_score': 0
+            'risk_score': 0,
+            # Kept for _generate_suggested_versions so the file is not read again;
+            # dropped before the results are returned
+            '_content': content
         }
         
+        # Index quote positions once; string literal checks are then binary searches
+        quote_offsets = _quote_offsets(content)
+        
+        # Suggestions are collected through a bound append; the loops below run per match
+        suggestions = []
+        add_suggestion = suggestions.append
+        
         # Find database references that could be templated
         if db_base:
             # Look for patterns like PLATFORM_SIT, ALTO_SIT, etc.
-            db_pattern = rf'{re.escape(db_base)}_[A-Z]+'
-            matches = re.finditer(db_pattern, content, re.IGNORECASE)
-            
-            for match in matches:
+            for match in self._db_ref_re.finditer(content):
                 suggestion = self._analyze_database_reference(
-                    match.group(), match.start(), match.end(), content, db_base
+                    match.group().decode(), match.start(), match.end(), content, quote_offsets, db_base
                 )
                 if suggestion:
-                    file_analysis['suggestions'].append(suggestion)
+                    add_suggestion(suggestion)
+        
+        # Collect database names with environment suffixes (e.g., STAGING_SIT, RAW_SIT)
+        # and role names with environment suffixes (e.g., ROLE_APP_CONSUME_SIT) in one pass.
+        # Each name keeps its own non-overlapping matches, as a separate scan per pattern would.
+        db_env_matches = {name: [] for name in _DB_ENV_NAMES}
+        role_matches = []
+        add_role_match = role_matches.append
+        next_start = {}
+        for match in _CANDIDATE_SCAN_RE.finditer(content):
+            key = match.group(2).decode().upper() if match.group(1) else 'ROLE'
+            start = match.start()
+            if start < next_start.get(key, 0):
+                continue
+            
+            match_text = (match.group(1) or match.group(3)).decode()
+            end = start + len(match_text)
+            next_start[key] = end
+            if key == 'ROLE':
+                add_role_match((match_text, start, end))
+            else:
+                db_env_matches[key].append((match_text, start, end, match.group(2).decode()))
         
-        # Look for database names with environment suffixes (e.g., STAGING_SIT, RAW_SIT)
         # Only template the environment part, keep database names unchanged
-        db_env_patterns = [
-            r'(STAGING)_[A-Z]+',  # STAGING_SIT, STAGING_UAT, etc.
-            r'(RAW)_[A-Z]+',      # RAW_SIT, RAW_UAT, etc.
-            r'(PROD)_[A-Z]+',     # PROD_SIT, PROD_UAT, etc.
-            r'(PREPARE)_[A-Z]+',     # PREPARE_SIT, PREPARE_UAT, etc.
-            r'(PLATFORM)_[A-Z]+',     # PLATFORM_SIT, PLATFORM_UAT, etc.
-            r'(CONSUME)_[A-Z]+',     # CONSUME_SIT, CONSUME_UAT, etc.
-        ]
-        
-        for pattern in db_env_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                match_text = match.group()
+        for name in _DB_ENV_NAMES:
+            for match_text, start, end, db_name in db_env_matches[name]:
                 # Only process if it ends with a valid environment
                 if any(env in match_text.upper() for env in ['SIT', 'UAT', 'PROD', 'DEV']):
                     suggestion = self._analyze_database_environment_reference(
-                        match_text, match.start(), match.end(), content, match.group(1)
+                        match_text, start, end, content, quote_offsets, db_name
                     )
                     if suggestion:
-                        file_analysis['suggestions'].append(suggestion)
+                        add_suggestion(suggestion)
         
-        # Look for role names with environment suffixes (e.g., ROLE_APP_CONSUME_SIT)
-        role_pattern = r'ROLE_[A-Z_]+_[A-Z]+'
-        role_matches = re.finditer(role_pattern, content, re.IGNORECASE)
-        for match in role_matches:
-            match_text = match.group()
+        for match_text, start, end in role_matches:
             # Check if it ends with a valid environment
             if any(env in match_text.upper() for env in ['SIT', 'UAT', 'PROD', 'DEV']):
                 suggestion = self._analyze_role_reference(
-                    match_text, match.start(), match.end(), content
+                    match_text, start, end, content, quote_offsets
                 )
                 if suggestion:
-                    file_analysis['suggestions'].append(suggestion)
+                    add_suggestion(suggestion)
+        
+        # Keep each distinct suggestion once, with how often it occurs in the file
+        file_analysis['suggestions'] = _merge_duplicate_suggestions(suggestions)
         
         # Find cross-database references
         cross_db_refs = self._find_cross_database_references(content)
@@ -131,7 +291,7 @@ class TemplatingAnalyzer:
         
         return file_analysis
     
-    def _analyze_database_reference(self, match_text, start, end, content, db_base):
+    def _analyze_database_reference(self, match_text, start, end, content, quote_offsets, db_base):
         """Analyze a specific database reference for templating safety."""
         
         # Get context around the match
@@ -140,13 +300,13 @@ class TemplatingAnalyzer:
         context = content[context_start:context_end]
         
         # Determine if this is safe to template
-        is_safe, reason = self._is_safe_to_template(match_text, context, content, start, end)
+        is_safe, reason = self._is_safe_to_template(match_text, context, quote_offsets, start, end)
         
         suggestion = {
             'type': 'database_reference',
             'original': match_text,
             'suggested': f"{{{{DB_BASE}}}}_{{{{ENV}}}}",
-            'context': context.strip(),
+            'context': context.decode('utf-8', 'replace').strip(),
             'position': (start, end),
             'is_safe': is_safe,
             'reason': reason,
@@ -155,7 +315,7 @@ class TemplatingAnalyzer:
         
         return suggestion
     
-    def _analyze_database_environment_reference(self, match_text, start, end, content, db_name):
+    def _analyze_database_environment_reference(self, match_text, start, end, content, quote_offsets, db_name):
         """Analyze a database name with environment suffix for templating safety."""
         
         # Get context around the match
@@ -164,14 +324,14 @@ class TemplatingAnalyzer:
         context = content[context_start:context_end]
         
         # Determine if this is safe to template
-        is_safe, reason = self._is_safe_to_template(match_text, context, content, start, end)
+        is_safe, reason = self._is_safe_to_template(match_text, context, quote_offsets, start, end)
         
         # Keep the database name unchanged, only template the environment part
         suggestion = {
             'type': 'database_environment_reference',
             'original': match_text,
             'suggested': db_name + "_{{ENV}}",
-            'context': context.strip(),
+            'context': context.decode('utf-8', 'replace').strip(),
             'position': (start, end),
             'is_safe': is_safe,
             'reason': reason,
@@ -180,7 +340,7 @@ class TemplatingAnalyzer:
         
         return suggestion
     
-    def _analyze_role_reference(self, match_text, start, end, content):
+    def _analyze_role_reference(self, match_text, start, end, content, quote_offsets):
         """Analyze a role reference with environment suffix for templating safety."""
         
         # Get context around the match
@@ -189,7 +349,7 @@ class TemplatingAnalyzer:
         context = content[context_start:context_end]
         
         # Determine if this is safe to template
-        is_safe, reason = self._is_safe_to_template(match_text, context, content, start, end)
+        is_safe, reason = self._is_safe_to_template(match_text, context, quote_offsets, start, end)
         
         # Extract the base part (e.g., ROLE_APP_CONSUME from ROLE_APP_CONSUME_SIT)
         base_part = '_'.join(match_text.split('_')[:-1])
@@ -198,7 +358,7 @@ class TemplatingAnalyzer:
             'type': 'role_reference',
             'original': match_text,
             'suggested': "{{" + base_part + "}}_{{ENV}}",
-            'context': context.strip(),
+            'context': context.decode('utf-8', 'replace').strip(),
             'position': (start, end),
             'is_safe': is_safe,
             'reason': reason,
@@ -207,70 +367,45 @@ class TemplatingAnalyzer:
         
         return suggestion
     
-    def _is_safe_to_template(self, match_text, context, full_content, start, end):
+    def _is_safe_to_template(self, match_text, context, quote_offsets, start, end):
         """Determine if a database reference is safe to template."""
         
-        # Check if this is in a FROM/JOIN clause (safe)
-        from_join_patterns = [
-            r'FROM\s+' + re.escape(match_text),
-            r'JOIN\s+' + re.escape(match_text),
-            r'UPDATE\s+' + re.escape(match_text),
-            r'DELETE\s+FROM\s+' + re.escape(match_text)
-        ]
+        # Check if this is in a string literal (dangerous) - a cheap index lookup,
+        # so it goes first and literal matches skip the context scans
+        if self._is_in_string_literal(quote_offsets, start, end):
+            return False, "Database reference in string literal - do not template"
         
-        for pattern in from_join_patterns:
-            if re.search(pattern, context, re.IGNORECASE):
-                return True, "Database reference in FROM/JOIN clause - safe to template"
+        # Check if this is in a FROM/JOIN clause (safe)
+        if _follows_keyword(_FROM_JOIN_RE, match_text, context):
+            return True, "Database reference in FROM/JOIN clause - safe to template"
         
         # Check if this is in a table/column name (dangerous)
-        table_column_patterns = [
-            r'CREATE\s+TABLE\s+' + re.escape(match_text),
-            r'CREATE\s+VIEW\s+' + re.escape(match_text),
-            r'ALTER\s+TABLE\s+' + re.escape(match_text),
-            r'DROP\s+TABLE\s+' + re.escape(match_text)
-        ]
-        
-        for pattern in table_column_patterns:
-            if re.search(pattern, context, re.IGNORECASE):
-                return False, "Database reference in table/view name - do not template"
-        
-        # Check if this is in a string literal (dangerous)
-        if self._is_in_string_literal(full_content, start, end):
-            return False, "Database reference in string literal - do not template"
+        if _follows_keyword(_TABLE_DDL_RE, match_text, context):
+            return False, "Database reference in table/view name - do not template"
         
         # Default to unsafe if we're not sure
         return False, "Unclear context - review manually"
     
-    def _is_in_string_literal(self, content, start, end):
+    def _is_in_string_literal(self, quote_offsets, start, end):
         """Check if position is inside a string literal."""
-        # Simple check for quotes around the position
-        before = content[:start]
-        after = content[end:]
-        
-        # Count single and double quotes before the position
-        single_quotes_before = before.count("'") - before.count("\\'")
-        double_quotes_before = before.count('"') - before.count('\\"')
+        single_quotes, double_quotes = quote_offsets
         
-        # Count single and double quotes after the position
-        single_quotes_after = after.count("'") - after.count("\\'")
-        double_quotes_after = after.count('"') - after.count('\\"')
-        
-        # If odd number of quotes before and after, we're inside a string
-        return (single_quotes_before % 2 == 1) or (double_quotes_before % 2 == 1)
+        # If odd number of unescaped quotes before the position, we're inside a string
+        return (bisect_left(single_quotes, start) % 2 == 1) or (bisect_left(double_quotes, start) % 2 == 1)
     
     def _find_cross_database_references(self, content):
         """Find references to other databases."""
         # Look for patterns like OTHER_DB.schema.table
-        cross_db_pattern = r'([A-Z_]+)\.([A-Z_]+)\.([A-Z_]+)'
-        matches = re.finditer(cross_db_pattern, content)
+        matches = _CROSS_DB_RE.finditer(content)
         
         cross_db_refs = []
+        add_ref = cross_db_refs.append
         for match in matches:
-            cross_db_refs.append({
-                'database': match.group(1),
-                'schema': match.group(2),
-                'table': match.group(3),
-                'full_reference': match.group(0),
+            add_ref({
+                'database': match.group(1).decode(),
+                'schema': match.group(2).decode(),
+                'table': match.group(3).decode(),
+                'full_reference': match.group(0).decode(),
                 'context': self._get_context_around_match(content, match.start(), match.end())
             })
         
@@ -280,10 +415,22 @@ class TemplatingAnalyzer:
         """Find potential issues in the DDL."""
         warnings = []
         
+        # One scan finds which environment names and dynamic SQL patterns occur,
+        # stopping as soon as every one of them has been seen
+        found_envs = set()
+        found_patterns = set()
+        total = len(_ENV_NAMES) + len(_SQL_INJECTION_PATTERNS)
+        for match in _WARNING_SCAN_RE.finditer(content):
+            if match.lastindex == 1:
+                found_envs.add(match.group(1).decode())
+            else:
+                found_patterns.add(match.lastindex - 2)
+            if len(found_envs) + len(found_patterns) == total:
+                break
+        
         # Check for hardcoded environment references
-        env_patterns = ['SIT', 'DEV', 'QA', 'UAT', 'PROD']
-        for env in env_patterns:
-            if env in content:
+        for env in _ENV_NAMES:
+            if env in found_envs:
                 warnings.append({
                     'type': 'hardcoded_environment',
                     'value': env,
@@ -292,14 +439,8 @@ class TemplatingAnalyzer:
                 })
         
         # Check for potential SQL injection patterns
-        sql_injection_patterns = [
-            r'EXEC\s*\(',
-            r'EXECUTE\s*\(',
-            r'EXECUTE\s+IMMEDIATE'
-        ]
-        
-        for pattern in sql_injection_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
+        for i, pattern in enumerate(_SQL_INJECTION_PATTERNS):
+            if i in found_patterns:
                 warnings.append({
                     'type': 'dynamic_sql',
                     'pattern': pattern,
@@ -313,34 +454,41 @@ class TemplatingAnalyzer:
         """Get context around a match position."""
         context_start = max(0, start - context_size)
         context_end = min(len(content), end + context_size)
-        return content[context_start:context_end].strip()
+        return content[context_start:context_end].decode('utf-8', 'replace').strip()
     
     def _calculate_risk_score(self, file_analysis):
         """Calculate overall risk score for a file."""
-        risk_score = 0
-        
-        # High risk warnings
-        high_risk_warnings = [w for w in file_analysis['warnings'] if w['risk_level'] == 'HIGH']
-        risk_score += len(high_risk_warnings) * 10
-        
-        # Medium risk warnings
-        medium_risk_warnings = [w for w in file_analysis['warnings'] if w['risk_level'] == 'MEDIUM']
-        risk_score += len(medium_risk_warnings) * 5
-        
-        # Unsafe templating suggestions
-        unsafe_suggestions = [s for s in file_analysis['suggestions'] if not s['is_safe']]
-        risk_score += len(unsafe_suggestions) * 3
-        
-        return risk_score
+        # Count high/medium risk warnings in one pass
+        high_risk_warnings = 0
+        medium_risk_warnings = 0
+        for warning in file_analysis['warnings']:
+            if warning['risk_level'] == 'HIGH':
+                high_risk_warnings += 1
+            elif warning['risk_level'] == 'MEDIUM':
+                medium_risk_warnings += 1
+        
+        # Unsafe templating suggestions (every occurrence counts)
+        unsafe_occurrences = 0
+        for suggestion in file_analysis['suggestions']:
+            if not suggestion['is_safe']:
+                unsafe_occurrences += suggestion['occurrences']
+        
+        return high_risk_warnings * 10 + medium_risk_warnings * 5 + unsafe_occurrences * 3
     
     def _generate_summary(self, analysis_results):
         """Generate summary statistics."""
         total_suggestions = len(analysis_results['templating_suggestions'])
-        safe_suggestions = len([s for s in analysis_results['templating_suggestions'] if s['is_safe']])
+        safe_suggestions = 0
+        for suggestion in analysis_results['templating_suggestions']:
+            if suggestion['is_safe']:
+                safe_suggestions += 1
         unsafe_suggestions = total_suggestions - safe_suggestions
         
         total_warnings = len(analysis_results['warnings'])
-        high_risk_warnings = len([w for w in analysis_results['warnings'] if w['risk_level'] == 'HIGH'])
+        high_risk_warnings = 0
+        for warning in analysis_results['warnings']:
+            if warning['risk_level'] == 'HIGH':
+                high_risk_warnings += 1
         
         return {
             'total_files': len(analysis_results['files_analyzed']),
@@ -358,13 +506,13 @@ class TemplatingAnalyzer:
         
         report_file = self.analysis_dir / "templating_analysis.md"
         
-        with open(report_file, 'w') as f:
-            f.write(self._generate_markdown_report(analysis_results))
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.writelines(self._iter_markdown_report(analysis_results))
     
-    def _generate_markdown_report(self, analysis_results):
-        """Generate markdown format analysis report."""
+    def _iter_markdown_report(self, analysis_results):
+        """Yield the markdown format analysis report in chunks."""
         
-        report = f"""# Templating Analysis Report
+        yield f"""# Templating Analysis Report
 
 ## Schema: {analysis_results['schema_name']}
 **Analyzed at:** {analysis_results['analyzed_at']}
@@ -386,56 +534,69 @@ class TemplatingAnalyzer:
         unsafe_suggestions = [s for s in analysis_results['templating_suggestions'] if not s['is_safe']]
         
         if safe_suggestions:
-            report += "### ✅ Safe to Template (High Confidence)\n\n"
+            yield "### ✅ Safe to Template (High Confidence)\n\n"
             for i, suggestion in enumerate(safe_suggestions, 1):
-                report += f"{i}. **{suggestion['original']}** → **{suggestion['suggested']}**\n"
-                report += f"   - Context: `{suggestion['context']}`\n"
-                report += f"   - Reason: {suggestion['reason']}\n\n"
+                yield (
+                    f"{i}. **{suggestion['original']}** → **{suggestion['suggested']}**\n"
+                    f"   - Context: `{suggestion['context']}`\n"
+                    f"   - Reason: {suggestion['reason']}\n"
+                    f"{_occurrences_line(suggestion)}\n"
+                )
         
         if unsafe_suggestions:
-            report += "### ⚠️ Needs Manual Review (Medium Confidence)\n\n"
+            yield "### ⚠️ Needs Manual Review (Medium Confidence)\n\n"
             for i, suggestion in enumerate(unsafe_suggestions, 1):
-                report += f"{i}. **{suggestion['original']}** → **{suggestion['suggested']}**\n"
-                report += f"   - Context: `{suggestion['context']}`\n"
-                report += f"   - Reason: {suggestion['reason']}\n"
-                report += f"   - Risk: {suggestion['risk_level']}\n\n"
+                yield (
+                    f"{i}. **{suggestion['original']}** → **{suggestion['suggested']}**\n"
+                    f"   - Context: `{suggestion['context']}`\n"
+                    f"   - Reason: {suggestion['reason']}\n"
+                    f"   - Risk: {suggestion['risk_level']}\n"
+                    f"{_occurrences_line(suggestion)}\n"
+                )
         
         # Cross-database references
         if analysis_results['cross_database_refs']:
-            report += "## 🔗 Cross-Database Dependencies\n\n"
-            report += "**These references should NOT be templated:**\n\n"
+            yield "## 🔗 Cross-Database Dependencies\n\n"
+            yield "**These references should NOT be templated:**\n\n"
             for ref in analysis_results['cross_database_refs']:
-                report += f"- **{ref['full_reference']}**\n"
-                report += f"  - Database: {ref['database']}\n"
-                report += f"  - Schema: {ref['schema']}\n"
-                report += f"  - Table: {ref['table']}\n"
-                report += f"  - Context: `{ref['context']}`\n\n"
+                yield (
+                    f"- **{ref['full_reference']}**\n"
+                    f"  - Database: {ref['database']}\n"
+                    f"  - Schema: {ref['schema']}\n"
+                    f"  - Table: {ref['table']}\n"
+                    f"  - Context: `{ref['context']}`\n\n"
+                )
         
         # Warnings
         if analysis_results['warnings']:
-            report += "## ⚠️ Warnings and Issues\n\n"
+            yield "## ⚠️ Warnings and Issues\n\n"
             for warning in analysis_results['warnings']:
-                report += f"- **{warning['type'].replace('_', ' ').title()}**\n"
-                report += f"  - {warning['message']}\n"
-                report += f"  - Risk Level: {warning['risk_level']}\n\n"
+                yield (
+                    f"- **{warning['type'].replace('_', ' ').title()}**\n"
+                    f"  - {warning['message']}\n"
+                    f"  - Risk Level: {warning['risk_level']}\n\n"
+                )
         
         # Recommendations
-        report += "## 💡 Recommendations\n\n"
-        report += "1. **Start with raw DDL** - Use the extracted files as-is initially\n"
-        report += "2. **Apply only 'Safe to Template' changes** - These are low-risk\n"
-        report += "3. **Manually review 'Needs Review' items** - Understand the context\n"
-        report += "4. **Never template cross-database references** - These must remain unchanged\n"
-        report += "5. **Test in target environment** - Verify changes work as expected\n"
-        report += "6. **Document your decisions** - Keep track of what was templated and why\n\n"
-        
-        report += "## 🚀 Next Steps\n\n"
-        report += "1. Review this analysis report\n"
-        report += "2. Run interactive review: `python scripts/export_schema.py --workflow review --schema " + analysis_results['schema_name'] + "`\n"
-        report += "3. Make templating decisions based on the analysis\n"
-        report += "4. Generate final version: `python scripts/export_schema.py --workflow generate --schema " + analysis_results['schema_name'] + "`\n"
-        report += "5. Commit final files: `python scripts/export_schema.py --workflow commit --schema " + analysis_results['schema_name'] + "`\n"
-        
-        return report
+        yield (
+            "## 💡 Recommendations\n\n"
+            "1. **Start with raw DDL** - Use the extracted files as-is initially\n"
+            "2. **Apply only 'Safe to Template' changes** - These are low-risk\n"
+            "3. **Manually review 'Needs Review' items** - Understand the context\n"
+            "4. **Never template cross-database references** - These must remain unchanged\n"
+            "5. **Test in target environment** - Verify changes work as expected\n"
+            "6. **Document your decisions** - Keep track of what was templated and why\n\n"
+        )
+        
+        schema_name = analysis_results['schema_name']
+        yield (
+            "## 🚀 Next Steps\n\n"
+            "1. Review this analysis report\n"
+            f"2. Run interactive review: `python scripts/export_schema.py --workflow review --schema {schema_name}`\n"
+            "3. Make templating decisions based on the analysis\n"
+            f"4. Generate final version: `python scripts/export_schema.py --workflow generate --schema {schema_name}`\n"
+            f"5. Commit final files: `python scripts/export_schema.py --workflow commit --schema {schema_name}`\n"
+        )
     
     def _generate_suggested_versions(self, analysis_results):
         """Generate suggested templated versions of the files."""
@@ -446,43 +607,32 @@ class TemplatingAnalyzer:
         for suggestion in analysis_results['templating_suggestions']:
             # Find which file this suggestion belongs to
             for file_analysis in analysis_results['files_analyzed']:
-                original_file = self.raw_dir / file_analysis['file_name']
-                with open(original_file, 'r') as f:
-                    content = f.read()
-                if suggestion['original'] in content:
+                if suggestion['original'].encode() in file_analysis['_content']:
                     if file_analysis['file_name'] not in suggestions_by_file:
                         suggestions_by_file[file_analysis['file_name']] = []
                     suggestions_by_file[file_analysis['file_name']].append(suggestion)
                     break
         
+        # Content of each file as read during analysis
+        contents = {file_analysis['file_name']: file_analysis['_content'] for file_analysis in analysis_results['files_analyzed']}
+        
         for file_name, file_suggestions in suggestions_by_file.items():
             if not file_suggestions:
                 continue
             
-            # Load original file
-            original_file = self.raw_dir / file_name
-            with open(original_file, 'r') as f:
-                content = f.read()
+            content = contents[file_name]
             
             # Apply safe suggestions only
-            suggested_content = content
-            applied_suggestions = []
-            
-            for suggestion in file_suggestions:
-                if suggestion['is_safe']:
-                    # Use case-insensitive replacement
-                    import re
-                    pattern = re.compile(re.escape(suggestion['original']), re.IGNORECASE)
-                    suggested_content = pattern.sub(suggestion['suggested'], suggested_content)
-                    applied_suggestions.append(suggestion)
+            applied_suggestions = [suggestion for suggestion in file_suggestions if suggestion['is_safe']]
+            suggested_content = _apply_suggestions(content, applied_suggestions)
             
             # Write suggested version
             suggested_file = self.suggested_dir / file_name
-            with open(suggested_file, 'w') as f:
-                f.write(f"-- SUGGESTED TEMPLATING (REVIEW CAREFULLY):\n")
-                f.write(f"-- This file contains suggested changes for multi-environment deployment\n")
-                f.write(f"-- ⚠️  MANUAL REVIEW REQUIRED before using\n")
-                f.write(f"-- Applied {len(applied_suggestions)} safe suggestions\n\n")
+            with open(suggested_file, 'wb') as f:
+                f.write(f"-- SUGGESTED TEMPLATING (REVIEW CAREFULLY):\n".encode())
+                f.write(f"-- This file contains suggested changes for multi-environment deployment\n".encode())
+                f.write(f"-- ⚠️  MANUAL REVIEW REQUIRED before using\n".encode())
+                f.write(f"-- Applied {len(applied_suggestions)} safe suggestions\n\n".encode())
                 f.write(suggested_content)
             
             print(f"💡 Suggested version generated: {suggested_file}")
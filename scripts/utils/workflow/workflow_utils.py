@@ -4,6 +4,8 @@ Common workflow utilities and helper functions.
 
 import os
 import shutil
+import threading
+import uuid
 from pathlib import Path
 from .state_manager import WorkflowStateManager
 
@@ -42,14 +44,39 @@ class WorkflowUtils:
     @staticmethod
     def check_required_files(temp_dir, required_files):
         """Check if required files exist."""
-        missing_files = []
         
+        # List each directory once instead of a stat per file
+        existing_names = {}
         for file_path in required_files:
-            full_path = os.path.join(temp_dir, file_path)
-            if not os.path.exists(full_path):
-                missing_files.append(file_path)
+            directory = os.path.dirname(file_path)
+            if directory not in existing_names:
+                try:
+                    with os.scandir(os.path.join(temp_dir, directory)) as entries:
+                        existing_names[directory] = {entry.name for entry in entries}
+                except (FileNotFoundError, NotADirectoryError):
+                    existing_names[directory] = set()
         
-        return missing_files
+        return [
+            file_path for file_path in required_files
+            if os.path.basename(file_path) not in existing_names[os.path.dirname(file_path)]
+        ]
+    
+    @staticmethod
+    def partition_decisions(decisions):
+        """Split review decisions into (accepted, rejected, quit_early) in one pass."""
+        accepted = []
+        rejected = []
+        quit_early = False
+        
+        for decision in decisions:
+            if decision['decision'] == 'accept':
+                accepted.append(decision)
+            elif decision['decision'] == 'reject':
+                rejected.append(decision)
+            elif decision['decision'] == 'quit':
+                quit_early = True
+        
+        return accepted, rejected, quit_early
     
     @staticmethod
     def show_workflow_error(schema_name, error_type, details=None):
@@ -102,7 +129,40 @@ class WorkflowUtils:
         temp_dir = f"schemas/{schema_name}/temp"
         
         if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+            WorkflowUtils.remove_tree_in_background(temp_dir)
+    
+    @staticmethod
+    def remove_tree_in_background(path):
+        """Move a directory aside and delete it on a background thread.
+        
+        The rename is immediate, so the path can be recreated straight away.
+        Trash left by an interrupted run is swept by the next call for the
+        same path.
+        """
+        path = Path(path)
+        doomed = list(path.parent.glob(f".trash-{path.name}-*"))
+        trash = path.with_name(f".trash-{path.name}-{uuid.uuid4().hex}")
+        
+        try:
+            os.rename(path, trash)
+            doomed.append(trash)
+        except OSError:
+            # Could not move it aside (e.g. a file in use on Windows); delete in place
+            shutil.rmtree(path)
+        
+        WorkflowUtils.remove_trees_in_background(doomed)
+    
+    @staticmethod
+    def remove_trees_in_background(paths):
+        """Delete directories on a background thread.
+        
+        The thread is not a daemon, so the interpreter waits for the deletes to
+        finish before exiting instead of abandoning them half done.
+        """
+        if paths:
+            threading.Thread(
+                target=lambda: [shutil.rmtree(path, ignore_errors=True) for path in paths]
+            ).start()
     
     @staticmethod
     def get_temp_directory_structure(schema_name):
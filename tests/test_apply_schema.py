@@ -0,0 +1,75 @@
+"""
+Tests for apply_schema helpers that run against a stub cursor.
+"""
+
+import os
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import apply_schema
+
+
+class StubCursor:
+    """Records executed SQL and returns fixed rows, or raises if given an error."""
+
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.executed = []
+        self.closed = False
+
+    def execute(self, sql):
+        self.executed.append(sql)
+        if self.error is not None:
+            raise self.error
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        self.closed = True
+
+
+class ChangeHistoryRecordedTest(unittest.TestCase):
+
+    CTX = SimpleNamespace(target_database="TEST_PLATFORM_SIT", schema_name="MONITORING")
+    SQL_FILES = [Path("V1.0.0__init.sql"), Path("V1.0.1__grants.sql"), Path("R__views.sql")]
+
+    def recorded(self, cursor, sql_files=SQL_FILES):
+        connection = SimpleNamespace(cursor=lambda: cursor)
+        with mock.patch.object(apply_schema, 'get_connection', return_value=connection):
+            return apply_schema.change_history_recorded(self.CTX, {'account': 'acct'}, sql_files)
+
+    def test_all_versioned_scripts_recorded(self):
+        cursor = StubCursor(rows=[("V1.0.0__init.sql",), ("V1.0.1__grants.sql",)])
+
+        self.assertTrue(self.recorded(cursor))
+        self.assertIn(apply_schema.CHANGE_HISTORY_TABLE, cursor.executed[0])
+        self.assertIn("'R__views.sql'", cursor.executed[0])
+        self.assertTrue(cursor.closed)
+
+    def test_missing_versioned_script(self):
+        cursor = StubCursor(rows=[("V1.0.0__init.sql",), ("R__views.sql",)])
+
+        self.assertFalse(self.recorded(cursor))
+
+    def test_folder_without_versioned_scripts(self):
+        files = [Path("R__views.sql")]
+
+        self.assertFalse(self.recorded(StubCursor(), files))
+        self.assertTrue(self.recorded(StubCursor(rows=[("R__views.sql",)]), files))
+
+    def test_missing_history_table(self):
+        cursor = StubCursor(error=Exception("Object 'METADATA.SCHEMACHANGE.CHANGE_HISTORY' does not exist"))
+
+        self.assertFalse(self.recorded(cursor))
+        self.assertTrue(cursor.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
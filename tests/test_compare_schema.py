@@ -0,0 +1,85 @@
+"""
+Tests for compare_schema helpers that run against a stub cursor.
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+
+class StubCursor:
+    """Records executed SQL and returns a fixed row."""
+
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+        self.closed = False
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        self.closed = True
+
+
+class StubConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+@unittest.skipUnless(importlib.util.find_spec('snowflake'), "snowflake-connector-python is not installed")
+class ComputeComparisonFingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        import compare_schema
+        self.compare_schema = compare_schema
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.schema_dir = temp_dir.name
+        for name, content in (("V1000__objects.sql", "CREATE TABLE T (ID INT);"), ("V1001__grants.sql", "GRANT ...;")):
+            with open(os.path.join(self.schema_dir, name), 'w') as f:
+                f.write(content)
+
+    # (LAST_ALTERED, COUNT) per fingerprinted view, then grants, then the schema itself
+    ROW = ("2024-01-01", 3) * 6 + ("2024-01-01",)
+
+    def fingerprint(self, schema="MY_SCHEMA", row=ROW):
+        cursor = StubCursor(row)
+        fingerprint = self.compare_schema.compute_comparison_fingerprint(
+            StubConnection(cursor), "PLATFORM_SIT", schema, self.schema_dir, "sit"
+        )
+        return fingerprint, cursor
+
+    def test_quotes_schema_and_closes_cursor(self):
+        fingerprint, cursor = self.fingerprint(schema="O'BRIEN")
+
+        self.assertIsNotNone(fingerprint)
+        self.assertEqual(len(cursor.executed), 1)
+        self.assertIn("TABLE_SCHEMA = 'O''BRIEN'", cursor.executed[0])
+        self.assertIn("SEQUENCE_SCHEMA = 'O''BRIEN'", cursor.executed[0])
+        self.assertIn("OBJECT_PRIVILEGES", cursor.executed[0])
+        self.assertTrue(cursor.closed)
+
+    def test_changes_with_target_metadata(self):
+        first, _ = self.fingerprint()
+        same, _ = self.fingerprint()
+        altered, _ = self.fingerprint(row=("2024-02-01",) + self.ROW[1:])
+        regranted, _ = self.fingerprint(row=self.ROW[:10] + ("2024-02-01", 3, "2024-01-01"))
+
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, altered)
+        self.assertNotEqual(first, regranted)
+
+
+if __name__ == '__main__':
+    unittest.main()
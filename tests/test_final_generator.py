@@ -0,0 +1,72 @@
+"""
+Tests for applying review decisions when generating final versions.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from utils.workflow.final_generator import _compile_decisions, _write_with_decisions
+
+
+def accept(original, suggested):
+    return {'decision': 'accept', 'original': original, 'suggested': suggested, 'context': '', 'reason': ''}
+
+
+class WriteWithDecisionsTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+
+    def apply(self, content, decisions):
+        src = self.temp_dir / "src.sql"
+        dst = self.temp_dir / "dst.sql"
+        src.write_bytes(content.encode('utf-8'))
+        accepted, pattern = _compile_decisions(decisions)
+        applied = _write_with_decisions(src, dst, accepted, pattern, lambda changes: "")
+        return dst.read_bytes().decode('utf-8'), [change['original'] for change in applied]
+
+    def test_longer_original_is_not_split_by_contained_one(self):
+        content, applied = self.apply(
+            "SELECT * FROM DB_SIT.A JOIN DB_SIT_X.B; -- é DB_SIT",
+            [accept('DB_SIT', 'DB_{{ENV}}'), accept('DB_SIT_X', 'DB_{{ENV}}_X')]
+        )
+
+        self.assertEqual(content, "SELECT * FROM DB_{{ENV}}.A JOIN DB_{{ENV}}_X.B; -- é DB_{{ENV}}")
+        self.assertEqual(applied, ['DB_SIT', 'DB_SIT_X'])
+
+    def test_contained_original_listed_first_does_not_win(self):
+        content, _ = self.apply(
+            "USE DB_SIT_X;",
+            [accept('DB_SIT', 'DB_{{ENV}}'), accept('DB_SIT_X', 'OTHER')]
+        )
+
+        self.assertEqual(content, "USE OTHER;")
+
+    def test_replacement_text_is_not_rewritten(self):
+        content, applied = self.apply(
+            "GRANT ROLE_SIT TO PLATFORM_SIT;",
+            [accept('PLATFORM_SIT', 'PLATFORM_ROLE_SIT'), accept('ROLE_SIT', 'ROLE_{{ENV}}')]
+        )
+
+        self.assertEqual(content, "GRANT ROLE_{{ENV}} TO PLATFORM_ROLE_SIT;")
+        self.assertEqual(applied, ['PLATFORM_SIT', 'ROLE_SIT'])
+
+    def test_no_accepted_decisions_copies_file(self):
+        content, applied = self.apply(
+            "SELECT 1;",
+            [{'decision': 'reject', 'original': 'X', 'suggested': 'Y', 'context': '', 'reason': ''}]
+        )
+
+        self.assertEqual(content, "SELECT 1;")
+        self.assertEqual(applied, [])
+
+
+if __name__ == '__main__':
+    unittest.main()